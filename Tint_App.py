@@ -62,20 +62,14 @@ The Tyre Inventory & Tracking App (Tint_App)
 
 import os
 import sys
+import json
 import re
+import time
 import shutil
-import random
 import logging
-import calendar
-from datetime import datetime, timedelta
+from datetime import datetime
 
-import matplotlib
-import matplotlib.dates as mdates
-import matplotlib.ticker as mticker
-import matplotlib.backends.backend_tkagg
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
-import matplotlib.pyplot as plt
-matplotlib.use('TkAgg')
+STARTUP_TIME = time.perf_counter()
 
 import numpy as np
 import pandas as pd
@@ -89,6 +83,20 @@ from tkinter import simpledialog as tkSimpleDialog
 from xml.etree import ElementTree as ET
 from xml.dom import minidom
 
+from traqwhel.paths import (DATA_SOURCE, CONFIG_SOURCE, CONFIG_FILE, INV_FILE_NAME, INV_IN_FILE_NAME, INV_IN_DB, TYRE_FILE_NAME,
+                           TYRE_DB, SQLITE_DB)
+from traqwhel.schema import TYRE_COLUMNS, parse_date_value
+from traqwhel.storage import DataStore, open_storage, migrate_csv_to_sqlite
+from traqwhel.depots import FleetStorage, is_depot_dir
+from traqwhel.tasks import TaskRunner
+from traqwhel.notify import ChangeNotifier, RECEIPTS, TRACKING, PROFILES, DATA
+from traqwhel.profiles import ProfileRegistry
+from traqwhel.fitment import find_fitment_conflicts, normalize_serial
+from traqwhel.ledger import consumption_forecast
+from traqwhel.mileage import fleet_mileage, tyre_lifecycles
+from traqwhel.charts import (draw_inventory_trend, draw_tyre_usage, draw_monthly_usage, draw_forecast, draw_vehicle_mileage,
+                             draw_tyre_mileage)
+
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -98,22 +106,13 @@ LARGE_FONT = ("Verdana", 12, "bold")
 LB_FONT = ("Verdana", 11, "bold")
 RB_FONT = ("Verdana", 10)
 
-CONFIG_SOURCE = os.path.join(os.getcwd(), "config")
 ASSETS_SOURCE = os.path.join(CONFIG_SOURCE, "assets")
-DATA_SOURCE = os.path.join(os.getcwd(), "data")
 LOG_SOURCE = os.path.join(os.getcwd(), "logs")
 DOCS_SOURCE = os.path.join(os.getcwd(), "docs")
 
-CONFIG_FILE = os.path.join(CONFIG_SOURCE, "systemconfig.xml")
-
-INV_FILE_NAME = "tyre_inventory_db.csv"
-INV_DB = os.path.join(DATA_SOURCE, INV_FILE_NAME)
+LIFECYCLE_FILE_NAME = "tyre_lifecycle_report.csv"
 
-INV_IN_FILE_NAME = "tyre_inventory_in_db.csv"
-INV_IN_DB = os.path.join(DATA_SOURCE, INV_IN_FILE_NAME)
-
-TYRE_FILE_NAME = "tyre_tracking_db.csv"
-TYRE_DB = os.path.join(DATA_SOURCE, TYRE_FILE_NAME)
+TASK_POLL_MS = 50
 
 
 def create_logger(name, basefile, version, loglevel):
@@ -134,7 +133,7 @@ def create_logger(name, basefile, version, loglevel):
     # Create log directory
     try:
         os.mkdir(LOG_SOURCE)
-    except Exception as e:
+    except Exception:
         pass
 
     # setup logger
@@ -154,6 +153,13 @@ def create_logger(name, basefile, version, loglevel):
 
     logger.addHandler(file_handler)
     logger.addHandler(stream_handler)
+
+    # The headless core logs to the same handlers
+    core_logger = logging.getLogger("traqwhel")
+    core_logger.setLevel(logging.DEBUG)
+    core_logger.addHandler(file_handler)
+    core_logger.addHandler(stream_handler)
+
     logger.info("Logging initialized")
 
     logger.info(f"Running from base file - {os.path.basename(basefile)}, version: {version}")
@@ -163,6 +169,28 @@ def create_logger(name, basefile, version, loglevel):
     return logger
 
 
+def load_tk_pyplot():
+    '''
+    Imports pyplot on the Tk backend, returns (plt, FigureCanvasTkAgg, NavigationToolbar2Tk)
+    matplotlib is only imported when the first page with a chart is built, not when the app opens
+    '''
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+    return plt, FigureCanvasTkAgg, NavigationToolbar2Tk
+
+
+def set_option_values(option_menu, tkvar, default, values):
+    '''Replaces the choices of a tk.OptionMenu in place, the selection goes back to default if it is no longer a choice'''
+    menu = option_menu['menu']
+    menu.delete(0, 'end')
+    for value in [default] + list(values):
+        menu.add_command(label=value, command=tk._setit(tkvar, value))
+    if tkvar.get() not in values:
+        tkvar.set(default)
+
+
 class TintApp(tk.Tk):
     '''
     Main GUI interface for Tint App
@@ -179,15 +207,27 @@ class TintApp(tk.Tk):
         tk.Tk.iconbitmap(self, default=os.path.join(ASSETS_SOURCE, 'mw_truck.ico'))
         tk.Tk.wm_title(self, "TINT [Tyre Inventory & Tracking] - {}".format(__version__))
 
+        self.changes = ChangeNotifier()
+        self.profiles = ProfileRegistry(CONFIG_FILE, notifier=self.changes)
+
         if os.path.isfile(CONFIG_FILE):
             self.firsttimeload = False
             logger.info(f"Configuration file exists in - {CONFIG_FILE}")
         else:
             self.firsttimeload = True
-            logger.info(f"Configuration file not exist - Creating first time configurations")
+            logger.info("Configuration file not exist - Creating first time configurations")
             self.create_config()
             logger.info(f"Configuration file created - {CONFIG_FILE}")
 
+        start = time.perf_counter()
+        self.datastore = DataStore()
+        self.storage = open_storage(datastore=self.datastore)
+        self.fleet_tkvar = tk.BooleanVar(value=False)
+        logger.info(f"Using {self.storage.name} storage, opened in {time.perf_counter() - start:.3f}s")
+
+        self.tasks = TaskRunner()
+        self._busy = False
+
         self.geometry("1220x720+10+10")
         self.resizable(False, False)  # Change to not resizable to manage image rendering and tk.entry positioning
         self.minsize(1016, 600)
@@ -206,13 +246,11 @@ class TintApp(tk.Tk):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
 
-        self.frames = {}
-
-        for F in (StartPage, TrackInvPage, TrackTyrePage, DashboardPage, ConfigPage):
+        self.busy_bar = ttk.Progressbar(self, mode='indeterminate', length=150)
 
-            frame = F(self.container, self)
-            self.frames[F] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
+        # Pages are built on first navigation, see get_frame()
+        self.frames = {}
+        self.current_frame = None
 
         # Create Menu bar
         self.menubar = tk.Menu(self)
@@ -227,11 +265,16 @@ class TintApp(tk.Tk):
 
         settingmenu = tk.Menu(self.menubar, tearoff=0)
         settingmenu.add_command(label="Configure", command=lambda: self.show_frame(ConfigPage))
+        settingmenu.add_command(label="Migrate Data to SQLite", command=self.migrate_storage)
+        settingmenu.add_separator()
+        settingmenu.add_checkbutton(label="Fleet View (All Depots)", variable=self.fleet_tkvar, command=self.toggle_fleet_view)
+        settingmenu.add_command(label="Add Depot to Fleet View", command=self.add_depot)
         self.menubar.add_cascade(label="Settings", menu=settingmenu)
 
         helpmenu = tk.Menu(self.menubar, tearoff=0)
         helpmenu.add_command(label="Open Install Directory", command=self.open_dir)
         helpmenu.add_command(label="View Logs", command=self.open_logs_dir)
+        helpmenu.add_command(label="Memory Report", command=self.memory_report)
         helpmenu.add_command(label="Documentation", command=self.docs)
         helpmenu.add_command(label="About", command=self.about)
 
@@ -240,6 +283,7 @@ class TintApp(tk.Tk):
         self.config(menu=self.menubar)
 
         self.protocol('WM_DELETE_WINDOW', self.on_exit)
+        self.poll_tasks()
 
         # Validate if configuration has entries
         if self.firsttimeload:
@@ -253,20 +297,130 @@ class TintApp(tk.Tk):
                 logger.info("Some profiles not filled in - Loading Configuration page")
                 self.start_frame(ConfigPage)
 
+        self.after_idle(self.log_startup_time)
+
     def open_logs_dir(self):
         os.startfile(LOG_SOURCE)
 
     def open_dir(self):
         os.startfile(os.getcwd())
 
-    def update_frames(self, page):
-        '''Update Frames'''
-        for F in (StartPage, TrackInvPage, TrackTyrePage, DashboardPage):
-            frame = F(self.container, self)
-            del self.frames[F]
-            self.frames[F] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
-        self.show_frame(page)
+    def notify_change(self, *topics):
+        '''Refreshes the pages showing the data sets (RECEIPTS, TRACKING, PROFILES) that changed'''
+        self.changes.notify(*topics)
+
+    def migrate_storage(self):
+        '''Migrates the csv databases into the SQLite database and switches storage over'''
+        if self.storage.name == "sqlite":
+            tkMessageBox.showinfo("Information", f"Data is already stored in SQLite database\n{SQLITE_DB}")
+            return
+        if self.storage.name == "fleet":
+            tkMessageBox.showinfo("Information", "Please turn off the fleet view before migrating this depot's data")
+            return
+
+        if tkMessageBox.askyesno("Confirm?", "Move tyre and inventory records into a local SQLite database?\nThe csv files are kept as a backup and will no longer be updated."):
+            self.run_task(None, self.migrate_csv, on_done=self.use_migrated_storage, on_error=self.migration_failed)
+        else:
+            logger.info("User aborted")
+
+    def migrate_csv(self):
+        '''Migrates the csv databases and opens the SQLite storage. Runs on the task worker'''
+        migrate_csv_to_sqlite(SQLITE_DB, INV_IN_DB, TYRE_DB)
+        return open_storage(datastore=self.datastore)
+
+    def migration_failed(self, e):
+        logger.error(f"Error migrating to SQLite - {e}", exc_info=e)
+        tkMessageBox.showerror("Error", "Error migrating data to SQLite. Please contact developer.")
+
+    def use_migrated_storage(self, storage):
+        self.storage = storage
+        logger.info(f"Using {self.storage.name} storage")
+        tkMessageBox.showinfo("Success", "Data migrated to SQLite database")
+        self.notify_change(*DATA)
+        self.show_frame(StartPage)
+
+    def fleet_depots(self):
+        '''Returns {depot name: data directory} of this installation followed by the depots added to the fleet view'''
+        depots = {"Local": DATA_SOURCE}
+        for name, data_source in self.profiles.depots().items():
+            if os.path.normcase(os.path.abspath(data_source)) != os.path.normcase(os.path.abspath(DATA_SOURCE)):
+                depots[name] = data_source
+        return depots
+
+    def toggle_fleet_view(self):
+        '''Switches storage between this depot's data and the read-only fleet view over all depots'''
+        if self.fleet_tkvar.get():
+            depots = self.fleet_depots()
+            if len(depots) < 2:
+                self.fleet_tkvar.set(False)
+                tkMessageBox.showinfo("Information", "No other depot added yet.\nUse Settings > Add Depot to Fleet View first.")
+                return
+            self.run_task("storage", self.open_fleet_storage, depots, on_done=self.use_fleet_storage, on_error=self.fleet_storage_failed)
+        else:
+            self.tasks.cancel("storage")
+            self.storage = open_storage(datastore=self.datastore)
+            logger.info(f"Using {self.storage.name} storage")
+            tk.Tk.wm_title(self, "TINT [Tyre Inventory & Tracking] - {}".format(__version__))
+            self.notify_change(*DATA)
+            self.show_frame(StartPage)
+
+    def open_fleet_storage(self, depots):
+        '''Opens the fleet view and loads every depot. Runs on the task worker'''
+        storage = FleetStorage(depots)
+        return storage, storage.depot_summary()
+
+    def fleet_storage_failed(self, e):
+        logger.error(f"Error opening fleet view - {e}", exc_info=e)
+        self.fleet_tkvar.set(False)
+        tkMessageBox.showerror("Error", "Error reading depot data. Please check the depot directories.")
+
+    def use_fleet_storage(self, result):
+        storage, summary = result
+        self.storage = storage
+        logger.info(f"Using fleet storage over {len(summary)} depots\n{summary}")
+        tk.Tk.wm_title(self, "TINT [Tyre Inventory & Tracking] - {} - Fleet View".format(__version__))
+        _text_ = "\n".join(f"{r.Depot}: {r.Tyre_Events} tyre events, {r.Vehicles} vehicles" for r in summary.itertuples(index=False))
+        tkMessageBox.showinfo("Fleet View", f"Showing fleet-wide data, records can only be entered at each depot.\n\n{_text_}")
+        self.notify_change(*DATA)
+        self.show_frame(StartPage)
+
+    def add_depot(self):
+        '''Adds another depot's data directory to the fleet view'''
+        data_source = tkFileDialog.askdirectory(title="Select the depot's data directory")
+        if not data_source:
+            logger.info("User aborted")
+            return
+        if not is_depot_dir(data_source):
+            tkMessageBox.showerror("Error", f"No tyre records found in\n{data_source}")
+            return
+
+        name = tkSimpleDialog.askstring("Depot Name", "Enter a name for the depot:", initialvalue=os.path.basename(os.path.dirname(data_source)))
+        if not name:
+            logger.info("User aborted")
+            return
+        if name == "Local" or name in self.profiles.depots():
+            tkMessageBox.showerror("Error", f"Depot {name} already exists")
+            return
+
+        root = self.profiles.editable_root()
+        ET.SubElement(root.find("App"), "AppSettings", {"Depot": name, "Depot_dir": data_source})
+        self.profiles.write(root)
+        logger.info(f"Depot {name} added to fleet view - {data_source}")
+        tkMessageBox.showinfo("Success", f"Depot {name} added to the fleet view")
+
+        if self.fleet_tkvar.get():
+            self.toggle_fleet_view()
+
+    def memory_report(self):
+        '''launch memory report window for the loaded databases, measured on the task worker'''
+        self.run_task(None, self.datastore.memory_report, on_done=self.show_memory_report)
+
+    def show_memory_report(self, df):
+        logger.info(f"Memory report\n{df}")
+        summary = df.groupby("Table")["Bytes"].sum() / 1024
+        _text_ = "\n".join(f"{k}: {v:,.1f} KB" for k, v in summary.items())
+        MsgBox(title="Memory Report", header="Memory used by loaded data", txtbox=True, txtboxwidth='60',
+               txtboxmessage=df.to_string(index=False), message=_text_ or "No data loaded")
 
     def first_time_msg(self):
         '''launch first time message box'''
@@ -289,27 +443,21 @@ class TintApp(tk.Tk):
         _abouthd_ = "TINT - Tyre Inventory & Tracking"
         _abouttxt_ = f"Copyright © 2021 AXONBOTS Pte Ltd\nVersion {__version__}"
 
-        msg = MsgBox(title=_title_, header=_abouthd_, txtbox=True, txtboxmessage=__license__, txtboxwidth='50', message=_abouttxt_)
+        MsgBox(title=_title_, header=_abouthd_, txtbox=True, txtboxmessage=__license__, txtboxwidth='50', message=_abouttxt_)
 
     def check_config_profiles(self):
         '''Checks if all configuration profiles have at least 1 entry.
         if all profiles have at least 1 entry, return True
         else return False'''
 
-        tree = ET.parse(CONFIG_FILE)
-        root = tree.getroot()
-
         profiles = []
-        for i in root:
-            if i.tag != "App":
-                prof_entries = len(i.findall(f"{i.tag}Profile"))
-                logger.info(f"{i.tag}Profile has {prof_entries} entries")
-                if prof_entries >= 1:
-                    profiles.append(1)
-                else:
-                    profiles.append(0)
+        for profile in self.profiles.profiles():
+            prof_entries = self.profiles.count(profile)
+            logger.info(f"{profile}Profile has {prof_entries} entries")
+            if prof_entries >= 1:
+                profiles.append(1)
             else:
-                pass
+                profiles.append(0)
 
         if all(profiles):
             logger.info("All profiles have entries")
@@ -338,43 +486,80 @@ class TintApp(tk.Tk):
         xml_str = root.toprettyxml(indent ="\t")
         with open(CONFIG_FILE, "w") as f:
             f.write(xml_str)
+        self.profiles.invalidate()
+
+    def run_task(self, slot, func, *args, on_done=None, on_error=None):
+        '''Runs func(*args) on the task worker, superseding the previous task of the slot, or queued
+        when slot is None (record appends, exports and other writes).
+        on_done(result) or on_error(exception) are called back on the GUI thread'''
+        self.tasks.submit(slot, func, *args, on_done=on_done, on_error=on_error)
+        self.show_busy(True)
+
+    def poll_tasks(self):
+        '''Delivers finished tasks, runs every TASK_POLL_MS for the life of the app'''
+        self.show_busy(self.tasks.poll() > 0)
+        self.after(TASK_POLL_MS, self.poll_tasks)
+
+    def show_busy(self, busy):
+        '''Shows the busy indicator while tasks are pending'''
+        if busy and not self._busy:
+            self.busy_bar.place(anchor='ne', relx='0.99', rely='0.01')
+            self.busy_bar.lift()
+            self.busy_bar.start(15)
+            self.config(cursor='watch')
+        elif not busy and self._busy:
+            self.busy_bar.stop()
+            self.busy_bar.place_forget()
+            self.config(cursor='')
+        self._busy = busy
 
     def load_profile_list(self, profile, key):
-        '''Loads up the config file (xml), search for the profile and key to return a list of values'''
-        tree = ET.parse(CONFIG_FILE)
-        root = tree.getroot()
-
-        values = []
-        if profile == "App":
-            el_ls = root.findall(profile)[0].findall(f"{profile}Settings")
-        else:
-            el_ls = root.findall(profile)[0].findall(f"{profile}Profile")
-        for el in el_ls:
-            if key in el.attrib.keys():
-                values.append(el.attrib[key])
+        '''Returns the list of values of key in the profile, served from the profile registry'''
+        return self.profiles.values(profile, key)
 
-        return values
+    def load_option_list(self, profile, key, column, on_load):
+        '''Calls on_load(values) back with the profile values of key followed by the other values of
+        column seen in the data. The data values are read on the task worker'''
+        values = list(self.profiles.values(profile, key))
+        self.run_task(None, self.storage.distinct_values, column,
+                      on_done=lambda data_values: on_load(list(dict.fromkeys(values + list(data_values)))))
 
     def start_frame(self, cont):
 
-        frame = self.frames[cont]
-        frame.tkraise()
-        logger.info("Show frame - {}".format(cont))
+        self.show_frame(cont)
         logger.info("Application initialized")
 
         if self.firsttimeload or not self.check_config_profiles():
             logger.info("This is first time load or missing profile entries detected - launching first time msg")
             self.first_time_msg()
 
+    def log_startup_time(self):
+        logger.info(f"Window ready in {time.perf_counter() - STARTUP_TIME:.3f}s after start")
+
+    def get_frame(self, cont):
+        '''Returns the page of class cont, building it on first use'''
+        frame = self.frames.get(cont)
+        if frame is None:
+            start = time.perf_counter()
+            frame = cont(self.container, self)
+            frame.grid(row=0, column=0, sticky="nsew")
+            self.frames[cont] = frame
+            logger.info(f"Built {cont.__name__} in {time.perf_counter() - start:.3f}s")
+        return frame
+
     def show_frame(self, dst_cont):
 
-        frame = self.frames[dst_cont]
+        frame = self.get_frame(dst_cont)
         frame.tkraise()
+        self.current_frame = frame
         logger.info("Show frame - {}".format(dst_cont))
+        if hasattr(frame, "on_show"):
+            frame.on_show()
 
     def on_exit(self):
         if tkMessageBox.askyesno('System Warning', 'Do you want to quit the application?'):
             logger.info("User terminate application")
+            self.tasks.shutdown()
             self.destroy()
             sys.exit()
         else:
@@ -388,19 +573,15 @@ class StartPage(tk.Frame):
 
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
+        self.controller = controller
         self.configure(height=str(controller.winfo_height()-20), width=str(controller.winfo_width()-20))
         self.grid(column='0', row='0', sticky='n')
 
-        try:
-            user_company = f"{controller.load_profile_list('App', 'Company')[0]}\nTyre Inventory & Tracking"
-        except Exception as e:
-            logger.exception(f"Error loading company name - {e}")
-            user_company = "Tyre Inventory & Tracking"
-
         self.header_lbl = ttk.Label(self)
         self.header_lbl.configure(font='{Source Sans Pro} 32 {bold}',
-                                  justify='center', text=user_company)
+                                  justify='center', text=self.company_title())
         self.header_lbl.place(anchor='n', relx='0.5', rely='0.1')
+        controller.changes.subscribe(self.refresh, PROFILES)
 
         self.track_tyre_lbl = ttk.Label(self)
         self.track_tyre_lbl.configure(
@@ -456,6 +637,17 @@ class StartPage(tk.Frame):
         self.exit_btn = ttk.Button(self, text="Close", width=20, command=lambda: controller.on_exit())
         self.exit_btn.place(anchor='n', relx='0.5', rely='0.9')
 
+    def company_title(self):
+        try:
+            return f"{self.controller.load_profile_list('App', 'Company')[0]}\nTyre Inventory & Tracking"
+        except Exception as e:
+            logger.exception(f"Error loading company name - {e}")
+            return "Tyre Inventory & Tracking"
+
+    def refresh(self, changed):
+        '''Shows the company name again after the app settings changed'''
+        self.header_lbl.configure(text=self.company_title())
+
 
 class TrackInvPage(tk.Frame):
     '''
@@ -464,6 +656,7 @@ class TrackInvPage(tk.Frame):
 
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
+        self.controller = controller
         self.configure(height=str(controller.winfo_height()-20), width=str(controller.winfo_width()-20))
         self.grid(column='0', row='0', sticky='n')
 
@@ -486,6 +679,7 @@ class TrackInvPage(tk.Frame):
         self.refresh_btn.configure(text='Refresh')
         self.refresh_btn.place(anchor='nw', relheight='0.05', relwidth='0.2', relx='0.03', rely='0.32', x='0', y='0')
 
+        plt, FigureCanvasTkAgg, NavigationToolbar2Tk = load_tk_pyplot()
         self.fig, self.ax = plt.subplots(tight_layout=True)
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.inv_sum_lbf)
         self.plot_widget = self.canvas.get_tk_widget()
@@ -495,7 +689,8 @@ class TrackInvPage(tk.Frame):
         toolbar.config(background='white')
         toolbar.update()
         toolbar.place(anchor='n', relheight='0.05', relwidth='0.95', relx='0.5', rely='0.94')
-        self.update_inv_trend()
+        # The inventory trend is loaded when the page is shown
+        self._stale = True
 
         self.inv_input_lbf = ttk.Labelframe(self)
         self.inv_input_lbf.configure(labelanchor='n', text='Input Data')
@@ -562,6 +757,14 @@ class TrackInvPage(tk.Frame):
         self.download_btn.configure(text='Download Inventory Data')
         self.download_btn.place(anchor='n', relheight='0.1', relwidth='0.5', relx='0.5', rely='0.7', x='0', y='0')
 
+        self.valuation_lbf = ttk.Labelframe(self.inv_input_lbf)
+        self.valuation_lbf.configure(text='Inventory Valuation')
+        self.valuation_lbf.place(anchor='n', relheight='0.15', relwidth='0.95', relx='0.5', rely='0.83', x='0', y='0')
+
+        self.valuation_lbl = ttk.Label(self.valuation_lbf)
+        self.valuation_lbl.configure(font='{source sans pro} 11 {}', justify='left', text='')
+        self.valuation_lbl.place(anchor='nw', relx='0.02', rely='0.02', x='0', y='0')
+
         self.back_btn = ttk.Button(self, text="Back to Main", width=20, command=lambda: controller.show_frame(StartPage))
         self.back_btn.place(anchor='n', relx='0.1', rely='0.95')
 
@@ -574,22 +777,60 @@ class TrackInvPage(tk.Frame):
         self.exit_btn = ttk.Button(self, text="Close", width=20, command=lambda: controller.on_exit())
         self.exit_btn.place(anchor='n', relx='0.9', rely='0.95')
 
-        self.controller = controller
+        controller.changes.subscribe(self.refresh, RECEIPTS, TRACKING, PROFILES)
+
+    def refresh(self, changed):
+        '''Refreshes the widgets showing the data sets that changed'''
+        if PROFILES in changed:
+            self.tyrenm_values = self.controller.load_profile_list("Tyre", "Tyre_name")
+            set_option_values(self.tyrenm_opt, self.tyrenm_tkvar, 'Select Tyre Name', self.tyrenm_values)
+        if changed & set(DATA):
+            if self.controller.current_frame is self:
+                self.update_inv_trend()
+            else:
+                self._stale = True
+
+    def on_show(self):
+        if self._stale:
+            self.update_inv_trend()
 
     def update_inv_trend(self):
+        '''Loads the inventory trend and valuation on the task worker, shown by show_inv_trend'''
+        self._stale = False
+        self.controller.run_task("inventory", self.load_inv_trend, on_done=self.show_inv_trend, on_error=self.inv_trend_failed)
+
+    def load_inv_trend(self):
+        '''Runs on the task worker. Returns the last 6 months of inventory, the stock values per tyre
+        and the cost of the tyres fitted in the last two months (None if valuation failed)'''
+        storage = self.controller.storage
+        storage.update_inventory()
+        df = storage.read_inventory().sort_index().tail(6)
+        try:
+            valuation = storage.valuation()
+            values = valuation.stock_values()
+            cost = valuation.monthly_consumption().tail(2).iloc[::-1]
+        except Exception as e:
+            logger.exception(f"Error valuing inventory - {e}")
+            values, cost = None, None
+        return df, values, cost
+
+    def inv_trend_failed(self, e):
+        logger.error(f"Error Updating inventory - {e}", exc_info=e)
+        self.ax.cla()
+        self.fig.canvas.draw()
+
+    def show_inv_trend(self, result):
+        df, values, cost = result
         try:
             self.ax.cla()
-            self.update_all_data()
-            df = pd.read_csv(INV_DB).tail(6)
-            df.sort_values("Time", inplace=True)
-            df.set_index("Time", inplace=True)
-            df.plot(kind='bar', ax=self.ax, grid=True)
-            self.ax.tick_params(axis="x", labelrotation=0)
-            self.ax.set_xlabel("Time")
-            self.ax.set_ylabel("Count of Tyres")
-            self.ax.set_title("Tyre Inventory Trend as of {}".format(datetime.now().replace(microsecond=0)))
+            draw_inventory_trend(self.ax, df, datetime.now().replace(microsecond=0))
             self.fig.canvas.draw()
 
+            values = self.update_valuation(values, cost)
+
+            for widget in self.cur_inv_lbf.winfo_children():
+                widget.destroy()
+
             df = df.tail(1)
             ct = 0
             for c in df.columns:
@@ -598,36 +839,26 @@ class TrackInvPage(tk.Frame):
                 tyre_name_lbl.configure(font='{source sans pro} 12 {bold}', justify='right', text='{}: '.format(c))
                 tyre_name_lbl.place(anchor='ne', relx='0.4', rely='0.{}'.format(ct*18), x='0', y='0')
 
+                value = f"  ({self.currency} {values.loc[c, 'FIFO_Value']:,.2f})" if c in values.index else ""
                 tyre_qty_lbl = ttk.Label(self.cur_inv_lbf)
-                tyre_qty_lbl.configure(font='{source sans pro} 12 {}', justify='right', text='{} Qty'.format(df[c].values[0]))
+                tyre_qty_lbl.configure(font='{source sans pro} 12 {}', justify='right', text='{} Qty{}'.format(df[c].values[0], value))
                 tyre_qty_lbl.place(anchor='nw', relx='0.4', rely='0.{}'.format(ct*18), x='0', y='0')
         except Exception as e:
             logger.exception(f"Error Updating inventory - {e}")
             self.fig.canvas.draw()
 
-    def update_all_data(self):
-        inv = pd.read_csv(INV_IN_DB, parse_dates=['Datetime'])
-        trk = pd.read_csv(TYRE_DB, parse_dates=['Date'])
-
-        inv['Date'] = pd.to_datetime(inv['Datetime'].dt.date)
-
-        df = pd.DataFrame(trk.pivot_table(values='Tyre_Size', index='Date', columns='Tyre_Name', aggfunc='count').to_records())
-        df.set_index('Date', inplace=True)
-        df = df * -1
-        df.reset_index(inplace=True)
-        df = df.append(pd.DataFrame(inv.pivot_table(values='Quantity', index='Date', columns='Tyre_Name', aggfunc='sum', fill_value=0).to_records()))
-
-        df.sort_values(['Date'], inplace=True)
-        df['Year'] = df['Date'].dt.year
-        df['Month'] = df['Date'].dt.month
-        df['Month'] = df['Month'].apply(lambda x: "0{}".format(x) if x<10 else str(x))
-        df['Time'] = df['Year'].astype("str") + "-" + df['Month'].astype("str")
-
-        df.drop(['Date','Year','Month'], inplace=True, axis=1)
-
-        pv = df.pivot_table(values=inv['Tyre_Name'].unique(), index=df['Time'], aggfunc='sum')
-        pv = pv.cumsum()
-        pv.to_csv(os.path.join(os.getcwd(),"Data","tyre_inventory_db.csv"))
+    def update_valuation(self, values, cost):
+        '''Shows the stock value and the cost of the tyres fitted in the last two months.
+        Returns the stock values per tyre'''
+        if values is None:
+            self.valuation_lbl.configure(text="Valuation not available")
+            return pd.DataFrame(columns=['FIFO_Value'])
+
+        lines = [f"Stock Value: {self.currency} {values['FIFO_Value'].sum():,.2f} (FIFO) / {self.currency} {values['Average_Value'].sum():,.2f} (Moving Average)"]
+        for month, row in cost.iterrows():
+            lines.append(f"Tyres Fitted {month}: {self.currency} {row['FIFO_Cost']:,.2f} (FIFO) / {self.currency} {row['Average_Cost']:,.2f} (Moving Average)")
+        self.valuation_lbl.configure(text="\n".join(lines))
+        return values
 
     def submit_entry(self):
         #validate entry:
@@ -645,60 +876,62 @@ class TrackInvPage(tk.Frame):
                 ddict['Total_Cost'] = float(self.total_cost_entry.get())
                 logger.info("Data Extracted - {}".format(ddict))
 
-                try:
-                    df = pd.read_csv(INV_IN_DB, parse_dates=['Datetime'])
-                    df.sort_values("Datetime", inplace=True)
-                    df = df.append(pd.DataFrame([ddict]))
-                    df.to_csv(INV_IN_DB, index=False)
-                    logger.info("Inventory DB updated")
-                except:
-                    df = pd.DataFrame([ddict])
-                    df.to_csv(INV_IN_DB, index=False)
-                    logger.info("Inventory DB updated")
-
+                self.controller.run_task(None, self.controller.storage.append_receipt, ddict, on_done=self.entry_submitted,
+                                         on_error=self.entry_failed)
 
-                self.update_inv_trend()
+            else:
+                pass
 
-                tkMessageBox.showinfo("Information", "Update Inventory Success!")
+    def entry_failed(self, e):
+        if isinstance(e, PermissionError):
+            logger.error(f"Error updating inventory DB - {e}")
+            tkMessageBox.showerror("Error", str(e))
+        else:
+            logger.error(f"Error updating inventory DB - {e}", exc_info=e)
+            tkMessageBox.showerror("Error", "Error updating inventory database. Please contact developer.")
 
-                self.tyrenm_tkvar.set("Select Tyre Name")
-                self.clear_entries(self.qty_entry, self.qty_text_)
-                self.clear_entries(self.cost_entry, self.cost_text_)
-                self.clear_total_cost_entry(self.total_cost_entry, self.total_cost_text_)
+    def entry_submitted(self, result):
+        logger.info("Inventory DB updated")
+        self.controller.notify_change(RECEIPTS)
 
-                self.controller.update_frames(TrackInvPage)
+        tkMessageBox.showinfo("Information", "Update Inventory Success!")
 
-            else:
-                pass
+        self.tyrenm_tkvar.set("Select Tyre Name")
+        self.clear_entries(self.qty_entry, self.qty_text_)
+        self.clear_entries(self.cost_entry, self.cost_text_)
+        self.clear_total_cost_entry(self.total_cost_entry, self.total_cost_text_)
 
     def download_inv_data(self):
         exp_dir = tkFileDialog.askdirectory()
 
         if os.path.isdir(exp_dir):
             logger.info(f"Export directory - [{exp_dir}]")
-            try:
-                shutil.copy(INV_IN_DB, os.path.join(exp_dir, INV_IN_FILE_NAME))
-            except IOError as io:
-                logger.exception(f"Error copying {INV_IN_DB} - {e}")
+            self.controller.run_task(None, self.export_inv_data, exp_dir, on_done=self.inv_data_exported)
+        else:
+            logger.error(f"Directory not selected, download operation skipped - {exp_dir}")
+            tkMessageBox.showinfo("Operation Cancelled", "Directory not selected. Export cancelled.")
 
+    def export_inv_data(self, exp_dir):
+        '''Exports the receipts and the monthly inventory into exp_dir. Runs on the task worker'''
+        storage = self.controller.storage
+        for table, file_name in [("receipts", INV_IN_FILE_NAME), ("inventory", INV_FILE_NAME)]:
             try:
-                shutil.copy(INV_DB, os.path.join(exp_dir, INV_FILE_NAME))
-            except IOError as io:
-                logger.exception(f"Error copying {INV_DB} - {e}")
+                storage.export_csv(table, os.path.join(exp_dir, file_name))
+            except Exception as e:
+                logger.exception(f"Error exporting {file_name} - {e}")
+        return exp_dir
 
-            if all([os.path.isfile(os.path.join(exp_dir, INV_IN_FILE_NAME)), os.path.isfile(os.path.join(exp_dir, INV_FILE_NAME))]):
-                tkMessageBox.showinfo("Success", "File export Success")
-            else:
-                path1 = os.path.join(exp_dir, INV_IN_FILE_NAME)
-                path1_st = os.path.isfile(path1)
-                path2 = os.path.join(exp_dir, INV_FILE_NAME)
-                path2_st = os.path.isfile(path2)
-                err_msg = f"File export error! - Path: {path1} is {path1_st}, Path {path2} is {path2_st}"
-                logger.error(err_msg)
-                tkMessageBox.showerror("Error", err_msg)
+    def inv_data_exported(self, exp_dir):
+        if all([os.path.isfile(os.path.join(exp_dir, INV_IN_FILE_NAME)), os.path.isfile(os.path.join(exp_dir, INV_FILE_NAME))]):
+            tkMessageBox.showinfo("Success", "File export Success")
         else:
-            logger.error(f"Directory not selected, download operation skipped - {exp_dir}")
-            tkMessageBox.showinfo("Operation Cancelled", "Directory not selected. Export cancelled.")
+            path1 = os.path.join(exp_dir, INV_IN_FILE_NAME)
+            path1_st = os.path.isfile(path1)
+            path2 = os.path.join(exp_dir, INV_FILE_NAME)
+            path2_st = os.path.isfile(path2)
+            err_msg = f"File export error! - Path: {path1} is {path1_st}, Path {path2} is {path2_st}"
+            logger.error(err_msg)
+            tkMessageBox.showerror("Error", err_msg)
 
     def clear_entries(self, entry_box, entry_text):
         entry_box.delete(0, "end")
@@ -783,8 +1016,9 @@ class TrackTyrePage(tk.Frame):
         self.view_lbf = ttk.Labelframe(self)
 
         self.view_vehnum_tkvar = tk.StringVar(value='Select Vehicle Number')
-        self.view_vehnum_values = pd.read_csv(TYRE_DB)['Vehicle_Number'].unique()
+        self.view_vehnum_values = controller.load_profile_list("Vehicle", "Truck_num")
         self.view_vehnum_opt = tk.OptionMenu(self.view_lbf, self.view_vehnum_tkvar, 'Select Vehicle Number', *self.view_vehnum_values, command=None)
+        controller.load_option_list("Vehicle", "Truck_num", "Vehicle_Number", self.set_view_vehicles)
         self.view_vehnum_opt.place(anchor='ne', relheight='0.5', relwidth='0.5', relx='0.52', rely='0.02', x='0', y='0')
 
         self.view_clr_btn = ttk.Button(self.view_lbf, command=self.clear_tyre_data)
@@ -908,6 +1142,18 @@ class TrackTyrePage(tk.Frame):
         self.bottom_view_lbl.configure(font='{source sans pro} 11 {bold}', text='Bottom View')
         self.bottom_view_lbl.place(anchor='n', relx='0.5', rely='0.93', x='0', y='0')
 
+        self.trace_entry = ttk.Entry(self.display_lbf)
+        self.trace_entry.configure(foreground='grey', font='{source sans pro} 11 {}', justify='center')
+        self.trace_ent_txt = '''Trace S/N'''
+        self.trace_entry.insert('0', self.trace_ent_txt)
+        self.trace_entry.bind('<FocusIn>', self.on_trace_click)
+        self.trace_entry.bind('<Return>', lambda evt: self.trace_serial())
+        self.trace_entry.place(anchor='n', relwidth='0.14', relx='0.52', rely='0.435', x='0', y='0')
+
+        self.trace_btn = ttk.Button(self.display_lbf, command=self.trace_serial)
+        self.trace_btn.configure(text='Trace Serial')
+        self.trace_btn.place(anchor='n', relwidth='0.14', relx='0.52', rely='0.495', x='0', y='0')
+
         self.tyre_ent_text_ = '''Enter S/N'''
 
         self.s1_l_ent = ttk.Entry(self.display_lbf)
@@ -1122,6 +1368,22 @@ class TrackTyrePage(tk.Frame):
         self.page_clear = True
 
         self.controller = controller
+        controller.changes.subscribe(self.refresh, TRACKING, PROFILES)
+
+    def refresh(self, changed):
+        '''Refreshes the option menus built from the data sets that changed'''
+        if PROFILES in changed:
+            self.emp_values = self.controller.load_profile_list("Employee", "Emp_name")
+            set_option_values(self.empname_opt, self.emp_tkvar, 'Select Employee', self.emp_values)
+            self.vehnum_values = self.controller.load_profile_list("Vehicle", "Truck_num")
+            set_option_values(self.vehnum_opt, self.vehnum_tkvar, 'Select Vehicle', self.vehnum_values)
+            self.tyrename_values = self.controller.load_profile_list("Tyre", "Tyre_name")
+            set_option_values(self.tyrename_opt, self.tyrename_tkvar, 'Select Tyre Name', self.tyrename_values)
+        self.controller.load_option_list("Vehicle", "Truck_num", "Vehicle_Number", self.set_view_vehicles)
+
+    def set_view_vehicles(self, values):
+        self.view_vehnum_values = values
+        set_option_values(self.view_vehnum_opt, self.view_vehnum_tkvar, 'Select Vehicle Number', values)
 
     def submit_tyre_data(self):
 
@@ -1134,7 +1396,7 @@ class TrackTyrePage(tk.Frame):
         validate_ls = [self.date_entry.get() == self.date_ent_txt, self.activity_tkvar.get() == "Select Activity", self.reason_entry.get() == self.reason_ent_txt, self.emp_tkvar.get() == "Select Employee", self.vehnum_tkvar.get() == "Select Vehicle", self.mile_entry.get() == self.mile_ent_txt, self.tyrename_tkvar.get() == "Select Tyre Name"]
 
         try:
-            evt_date = pd.to_datetime(self.date_entry.get())
+            evt_date = parse_date_value(self.date_entry.get())
             logger.info(f"Event Date is valid - {evt_date}")
         except Exception as e:
             logger.exception(f"Error when checking time - {e}")
@@ -1161,7 +1423,7 @@ class TrackTyrePage(tk.Frame):
                 else:
                     try:
                         ddict = {}
-                        ddict['Date'] = evt_date
+                        ddict['Date'] = evt_date.date()
                         ddict['Activity'] = self.activity_tkvar.get()
                         ddict['Reason'] = self.reason_entry.get()
                         ddict['Employee_Name'] = self.emp_tkvar.get()
@@ -1178,15 +1440,44 @@ class TrackTyrePage(tk.Frame):
                         logger.exception(f"Error appending input - {e}")
                         tkMessageBox.showerror("Error", "Error appending input. Please contact developer.")
 
-            df = pd.read_csv(TYRE_DB, parse_dates=['Date'])
-            df = df.append(pd.DataFrame(dlist))
-
-            df.to_csv(TYRE_DB, index=False)
+            batch = pd.DataFrame(dlist, columns=TYRE_COLUMNS)
+            storage = self.controller.storage
+            self.controller.run_task(None, lambda: find_fitment_conflicts(batch, storage.fitments()),
+                                     on_done=lambda conflicts: self.save_tyre_data(dlist, conflicts), on_error=self.conflict_check_failed)
+
+    def conflict_check_failed(self, e):
+        logger.error(f"Error checking tyre fitment conflicts - {e}", exc_info=e)
+        tkMessageBox.showerror("Error", "Error checking tyre serials. Please contact developer.")
+
+    def save_tyre_data(self, dlist, conflicts):
+        '''Confirms the fitment conflicts found in a batch of tyre events, then appends the batch on the task worker'''
+        if len(conflicts):
+            _text_ = "\n".join(f"{r.Tyre_Serial} [{r.Tyre_Location}]: {r.Conflict}" for r in conflicts.itertuples(index=False))
+            logger.warning(f"Tyre fitment conflicts found\n{_text_}")
+            if (conflicts['Conflict'] == "Entered more than once").any():
+                tkMessageBox.showerror("Error", f"Duplicate tyre serials entered, please check again\n\n{_text_}")
+                return
+            if not tkMessageBox.askyesno("Conflict", f"The following tyres are recorded as fitted elsewhere:\n\n{_text_}\n\nSave anyway?"):
+                logger.info("User aborted")
+                return
+
+        self.controller.run_task(None, self.controller.storage.append_tyre_events, dlist,
+                                 on_done=lambda result: self.tyre_data_saved(len(dlist)), on_error=self.tyre_data_failed)
+
+    def tyre_data_failed(self, e):
+        if isinstance(e, PermissionError):
+            logger.error(f"Error updating tyre DB - {e}")
+            tkMessageBox.showerror("Error", str(e))
+        else:
+            logger.error(f"Error updating tyre DB - {e}", exc_info=e)
+            tkMessageBox.showerror("Error", "Error updating tyre database. Please contact developer.")
 
-            tkMessageBox.showinfo("Success", "Tyre Event Updated")
+    def tyre_data_saved(self, rows):
+        logger.info(f"Tyre DB updated - {rows} rows appended")
+        self.controller.notify_change(TRACKING)
+        tkMessageBox.showinfo("Success", "Tyre Event Updated")
 
-            self.clear_vehicle_tyre_data()
-            self.controller.update_frames(TrackTyrePage)
+        self.clear_vehicle_tyre_data()
 
     def check_tyre_data(self):
         if self.view_vehnum_tkvar.get() == "Select Vehicle Number":
@@ -1195,29 +1486,42 @@ class TrackTyrePage(tk.Frame):
         else:
             logger.info(f"Vehicle selected - {self.view_vehnum_tkvar.get()}")
 
-        try:
-            df = pd.read_csv(TYRE_DB, parse_dates=['Date'])
-            df = df[df['Vehicle_Number'] == self.view_vehnum_tkvar.get()]
-            df.reset_index(drop=True, inplace=True)
+        vehicle_number = self.view_vehnum_tkvar.get()
+        self.controller.run_task("vehicle", self.load_vehicle_tyres, vehicle_number, on_done=self.show_vehicle_tyres,
+                                 on_error=self.vehicle_tyres_failed)
+
+    def load_vehicle_tyres(self, vehicle_number):
+        '''Runs on the task worker. Returns the vehicle number, the tyres fitted per location and the
+        (mileage, date) of its last record'''
+        fitments = self.controller.storage.fitments()
+        fitted = fitments.vehicle(vehicle_number)
+        if not fitted:
+            raise ValueError(f"No tyre records for vehicle {vehicle_number}")
+        return vehicle_number, {loc: dict(rec) for loc, rec in fitted.items()}, fitments.vehicle_summary(vehicle_number)
+
+    def vehicle_tyres_failed(self, e):
+        logger.error(f"Error while loading tyre data - {e}", exc_info=e)
+        tkMessageBox.showerror("Error", "Please check Vehicle Number selection")
+        self.clear_tyre_data()
 
+    def show_vehicle_tyres(self, result):
+        vehicle_number, fitted, (mileage, last_mod) = result
+        try:
             self.view_veh_lbl = ttk.Label(self.display_lbf)
             self.view_veh_lbl.configure(background="#4D6073", foreground='white', font='{Source Sans Pro} 11 {bold} {underline}',
                                       justify='center', text='Vehicle Information')
             self.view_veh_lbl.place(anchor='n', relx='0.52', rely='0.58')
 
-            mileage = df[df['Date'] == df['Date'].max()]['Vehicle_Mileage'].max()
-            last_mod = df['Date'].max().date()
+            last_mod = last_mod.date()
 
             logger.info(f"Mileage is {mileage}, Last Date is {last_mod}")
 
             self.view_veh_info_lbl = ttk.Label(self.display_lbf)
-            self.view_veh_info_lbl.configure(background="#4D6073", foreground='white', font='{Source Sans Pro} 11 {}', justify='center', text=f"Vehicle Number: {self.view_vehnum_tkvar.get()}\nVehicle Mileage: {mileage}km\nLast Modified: {last_mod}")
+            self.view_veh_info_lbl.configure(background="#4D6073", foreground='white', font='{Source Sans Pro} 11 {}', justify='center', text=f"Vehicle Number: {vehicle_number}\nVehicle Mileage: {mileage}km\nLast Modified: {last_mod}")
             self.view_veh_info_lbl.place(anchor='n', relx='0.52', rely='0.63')
 
-            for loc in df['Tyre_Location'].unique():
-                sdf = df[df['Tyre_Location'] == loc]
-                sdf = sdf[sdf['Date'] == sdf['Date'].max()]
-                serial = sdf['Tyre_Serial'].values[0]
+            for loc, rec in fitted.items():
+                serial = rec['Tyre_Serial']
                 ent_field = self.ent_dict[loc.lower().replace("-","_")]
                 ent_field.delete(0, "end")
                 ent_field.insert(0, serial)
@@ -1247,7 +1551,7 @@ class TrackTyrePage(tk.Frame):
             for i in range(0, len(self.default_options)):
                 self.default_options[i].set(self.default_options_values[i])
         except Exception as e:
-            logger.exception(f"Error clearing options - {opt}, {var} - {e}")
+            logger.exception(f"Error clearing options - {e}")
 
     def clear_tyre_data(self):
         try:
@@ -1261,26 +1565,64 @@ class TrackTyrePage(tk.Frame):
             ent_field.insert(0, self.tyre_ent_text_)
             ent_field.config(foreground = "grey")
 
+    def on_trace_click(self, evt):
+        if self.trace_entry.get() == self.trace_ent_txt:
+            self.trace_entry.delete(0, "end")
+            self.trace_entry.config(foreground='black')
+
+    def trace_serial(self):
+        serial = self.trace_entry.get().strip()
+        if serial in ("", self.trace_ent_txt):
+            tkMessageBox.showerror("Error", "Please enter the tyre serial number to trace")
+            return
+
+        logger.info(f"Tracing tyre serial - {serial}")
+        self.controller.run_task("trace", self.controller.storage.serial_history, serial,
+                                 on_done=lambda df: self.show_serial_history(serial, df),
+                                 on_error=lambda e: self.serial_history_failed(serial, e))
+
+    def serial_history_failed(self, serial, e):
+        logger.error(f"Error while tracing tyre serial {serial} - {e}", exc_info=e)
+        tkMessageBox.showerror("Error", "Error while tracing tyre serial. Please contact developer.")
+
+    def show_serial_history(self, serial, df):
+        if df.empty:
+            tkMessageBox.showinfo("Not Found", f"No records found for tyre serial {serial}")
+            return
+
+        lines = []
+        for rec in df.itertuples(index=False):
+            lines.append(f"{rec.Date:%Y-%m-%d}  {rec.Activity}  {rec.Vehicle_Number} [{rec.Tyre_Location}]  {rec.Vehicle_Mileage}km  {rec.Reason}")
+        _text_ = f"{len(df)} record(s) across {df['Vehicle_Number'].nunique()} vehicle(s)"
+        MsgBox(title="Tyre Serial History", header=f"History of tyre {normalize_serial(serial)}", txtbox=True, txtboxwidth='80',
+               txtboxmessage="\n".join(lines), message=_text_)
+
     def download_tyre_data(self):
         exp_dir = tkFileDialog.askdirectory()
 
         if os.path.isdir(exp_dir):
             logger.info(f"Export directory - [{exp_dir}]")
-            try:
-                shutil.copy(TYRE_DB, os.path.join(exp_dir, TYRE_FILE_NAME))
-            except IOError as io:
-                logger.exception(f"Error copying {TYRE_DB} - {e}")
-
-            if all([os.path.isfile(os.path.join(exp_dir, TYRE_FILE_NAME)), os.path.isfile(os.path.join(exp_dir, TYRE_FILE_NAME))]):
-                tkMessageBox.showinfo("Success", "File export Success")
-            else:
-                err_msg = "File export error! - Path: {} is {}".format(os.path.join(exp_dir, TYRE_FILE_NAME), os.path.isfile(os.path.join(exp_dir, TYRE_FILE_NAME)))
-                logger.error(err_msg)
-                tkMessageBox.showerror("Error", err_msg)
+            self.controller.run_task(None, self.export_tyre_data, exp_dir, on_done=self.tyre_data_exported)
         else:
             logger.error(f"Directory not selected, download operation skipped - {exp_dir}")
             tkMessageBox.showinfo("Operation Cancelled", "Directory not selected. Export cancelled.")
 
+    def export_tyre_data(self, exp_dir):
+        '''Exports the tyre events into exp_dir. Runs on the task worker'''
+        try:
+            self.controller.storage.export_csv("tyre_events", os.path.join(exp_dir, TYRE_FILE_NAME))
+        except Exception as e:
+            logger.exception(f"Error exporting {TYRE_FILE_NAME} - {e}")
+        return exp_dir
+
+    def tyre_data_exported(self, exp_dir):
+        if all([os.path.isfile(os.path.join(exp_dir, TYRE_FILE_NAME)), os.path.isfile(os.path.join(exp_dir, TYRE_FILE_NAME))]):
+            tkMessageBox.showinfo("Success", "File export Success")
+        else:
+            err_msg = "File export error! - Path: {} is {}".format(os.path.join(exp_dir, TYRE_FILE_NAME), os.path.isfile(os.path.join(exp_dir, TYRE_FILE_NAME)))
+            logger.error(err_msg)
+            tkMessageBox.showerror("Error", err_msg)
+
     def on_widget_click(self, evt):
         self.widget = self.focus_get()
         logger.info(f"{self.widget} is in focus")
@@ -1326,6 +1668,7 @@ class DashboardPage(tk.Frame):
 
     def __init__(self, parent, controller):
         tk.Frame.__init__(self, parent)
+        self.controller = controller
         self.configure(height=str(controller.winfo_height()-20), width=str(controller.winfo_width()-20))
         self.grid(column='0', row='0', sticky='n')
 
@@ -1344,8 +1687,10 @@ class DashboardPage(tk.Frame):
         self.func_lblf.place(anchor='nw', relheight='0.9', relwidth='0.24', relx='0.01', rely='0.0', x='0', y='0')
 
         self._func_tkvar = tk.StringVar(value='Tyre Usage')
-        # __values = ["Average Tyre Mileage", "Average Vehicle Mileage"]
-        __values = []
+        self._forecasts = {}
+        self._last_chart = None
+        self._stale = False
+        __values = ["Monthly Tyre Usage", "Tyre Forecast", "Average Tyre Mileage", "Average Vehicle Mileage"]
         self._func_tkvar.trace("w", self.update_setting_menu)
         self.func_menu = tk.OptionMenu(self.func_lblf, self._func_tkvar, 'Tyre Usage', *__values, command=None)
         self.func_menu.place(anchor='nw', relheight='0.98', relwidth='0.98', relx='0.01', rely='0.01', x='0', y='0')
@@ -1359,8 +1704,10 @@ class DashboardPage(tk.Frame):
         self.plot_btn.configure(cursor='hand2', text='Plot Chart', width='20')
         self.plot_btn.place(anchor='nw', relheight='0.9', relwidth='0.2', relx='0.01', rely='0.01', x='0', y='0')
 
-        # Plot dummy Canvas
+        # Plot dummy Canvas, the Tyre Usage chart is drawn when the page is first shown
+        plt, FigureCanvasTkAgg, NavigationToolbar2Tk = load_tk_pyplot()
         fig, ax = plt.subplots(tight_layout=True)
+        self.fig = fig
         canvas = FigureCanvasTkAgg(fig, master=self)
         self.plot_widget = canvas.get_tk_widget()
         self.plot_widget.place(anchor='n', relheight='0.68', relwidth='0.98', relx='0.5', rely='0.22')
@@ -1369,7 +1716,6 @@ class DashboardPage(tk.Frame):
         self.toolbar.config(background='white')
         self.toolbar.update()
         self.toolbar.place(anchor='n', relheight='0.05', relwidth='0.98', relx='0.5', rely='0.891')
-        self.track_inv_tyre_usage()
 
         self.back_btn = ttk.Button(self, text="Back to Main", width=20, command=lambda: controller.show_frame(StartPage))
         self.back_btn.place(anchor='n', relx='0.1', rely='0.95')
@@ -1383,6 +1729,31 @@ class DashboardPage(tk.Frame):
         self.exit_btn = ttk.Button(self, text="Close", width=20, command=lambda: controller.on_exit())
         self.exit_btn.place(anchor='n', relx='0.9', rely='0.95')
 
+        controller.changes.subscribe(self.refresh, RECEIPTS, TRACKING, PROFILES)
+
+    def refresh(self, changed):
+        '''Redraws the chart on display when its data changed, or marks it stale until the page is shown.
+        The vehicle menu is refreshed in place'''
+        if self._func_tkvar.get() == "Average Tyre Mileage":
+            self.controller.load_option_list("Vehicle", "Truck_num", "Vehicle_Number", self.set_vehicles)
+        if changed & set(DATA) and self._last_chart is not None:
+            if self.controller.current_frame is self:
+                self.plot_chart(*self._last_chart)
+            else:
+                self._stale = True
+
+    def set_vehicles(self, values):
+        '''Fills the vehicle menu of the Average Tyre Mileage settings, if still on display'''
+        if self._func_tkvar.get() == "Average Tyre Mileage" and self.sel_veh_num_menu.winfo_exists():
+            set_option_values(self.sel_veh_num_menu, self._vehnum_tkvar, 'Select Vehicle Number', values)
+
+    def on_show(self):
+        if self._last_chart is None:
+            self.track_inv_tyre_usage()
+        elif self._stale:
+            self._stale = False
+            self.plot_chart(*self._last_chart)
+
     def update_setting_menu(self, *args):
         for widget in self.option_lblf.winfo_children():
             widget.destroy()
@@ -1392,16 +1763,40 @@ class DashboardPage(tk.Frame):
             self.plot_btn.configure(cursor='hand2', text='Plot Chart', width='20')
             self.plot_btn.place(anchor='nw', relheight='0.8', relwidth='0.2', relx='0.01', rely='0.1', x='0', y='0')
 
+        elif self._func_tkvar.get() == "Monthly Tyre Usage":
+            self.plot_btn = ttk.Button(self.option_lblf, command=self.plot_monthly_usage)
+            self.plot_btn.configure(text='Plot Chart')
+            self.plot_btn.place(anchor='nw', relheight='0.8', relwidth='0.2', relx='0.01', rely='0.1', x='0', y='0')
+
         elif self._func_tkvar.get() == "Average Tyre Mileage":
             self._vehnum_tkvar = tk.StringVar(value='Select Vehicle Number')
-            _vehnum_values = pd.read_csv(TYRE_DB)['Vehicle_Number'].unique()
+            _vehnum_values = self.controller.load_profile_list("Vehicle", "Truck_num")
             self.sel_veh_num_menu = tk.OptionMenu(self.option_lblf, self._vehnum_tkvar, 'Select Vehicle Number', *_vehnum_values, command=None)
             self.sel_veh_num_menu.place(anchor='nw', relheight='0.8', relwidth='0.2', relx='0.01', rely='0.1', x='0', y='0')
+            self.controller.load_option_list("Vehicle", "Truck_num", "Vehicle_Number", self.set_vehicles)
 
             self.plot_btn = ttk.Button(self.option_lblf, command=lambda: self.plot_tyre_mileage(self._vehnum_tkvar.get()))
             self.plot_btn.configure(text='Plot Chart')
             self.plot_btn.place(anchor='nw', relheight='0.8', relwidth='0.2', relx='0.22', rely='0.1', x='0', y='0')
 
+            self.export_btn = ttk.Button(self.option_lblf, command=self.download_lifecycle_report)
+            self.export_btn.configure(text='Download Tyre Lifecycles')
+            self.export_btn.place(anchor='nw', relheight='0.8', relwidth='0.2', relx='0.43', rely='0.1', x='0', y='0')
+
+        elif self._func_tkvar.get() == "Tyre Forecast":
+            self._window_tkvar = tk.StringVar(value='6 Months')
+            _window_values = ['3 Months', '12 Months']
+            self.sel_window_menu = tk.OptionMenu(self.option_lblf, self._window_tkvar, '6 Months', *_window_values, command=None)
+            self.sel_window_menu.place(anchor='nw', relheight='0.8', relwidth='0.2', relx='0.01', rely='0.1', x='0', y='0')
+
+            self.plot_btn = ttk.Button(self.option_lblf, command=lambda: self.plot_forecast(int(self._window_tkvar.get().split()[0])))
+            self.plot_btn.configure(text='Plot Chart')
+            self.plot_btn.place(anchor='nw', relheight='0.8', relwidth='0.2', relx='0.22', rely='0.1', x='0', y='0')
+
+            self.report_btn = ttk.Button(self.option_lblf, command=lambda: self.show_reorder_report(int(self._window_tkvar.get().split()[0])))
+            self.report_btn.configure(text='Reorder Report')
+            self.report_btn.place(anchor='nw', relheight='0.8', relwidth='0.2', relx='0.43', rely='0.1', x='0', y='0')
+
         elif self._func_tkvar.get() == "Average Vehicle Mileage":
             logger.info("Displaying Plot button for Average Mileage Per Vehicle")
             self.plot_btn = ttk.Button(self.option_lblf, command=self.plot_per_vehicle_mileage)
@@ -1412,14 +1807,18 @@ class DashboardPage(tk.Frame):
 
             pass
 
-    def track_inv_tyre_usage(self):
-
-        fig, (ax1, ax2) = plt.subplots(2, 1, sharex=True, tight_layout=True)
+    def new_canvas(self, nrows=1, sharex=False):
+        '''Replaces the chart canvas and toolbar with a new figure of nrows stacked axes, returns (fig, axes)'''
+        plt, FigureCanvasTkAgg, NavigationToolbar2Tk = load_tk_pyplot()
+        fig, axes = plt.subplots(nrows, 1, sharex=sharex, tight_layout=True)
         canvas = FigureCanvasTkAgg(fig, master=self)
 
         # Clear Canvas
         self.plot_widget.destroy()
         self.toolbar.destroy()
+        if self.fig is not None:
+            plt.close(self.fig)
+        self.fig = fig
 
         # Create canvas
         self.plot_widget = canvas.get_tk_widget()
@@ -1429,132 +1828,113 @@ class DashboardPage(tk.Frame):
         self.toolbar.config(background='white')
         self.toolbar.update()
         self.toolbar.place(anchor='n', relheight='0.05', relwidth='0.98', relx='0.5', rely='0.891')
+        return fig, axes
 
-        try:
-            trk = pd.read_csv(TYRE_DB, parse_dates=['Date'])
-            inv = pd.read_csv(INV_IN_DB, parse_dates=['Datetime'])
-
-            trk['Date'] = trk['Date'].dt.floor(freq='d')
-            inv['Date'] = inv['Datetime'].dt.floor(freq='d')
-
-            df = inv[['Date','Tyre_Name','Quantity']]
-            df['Type'] = "IN"
-            df['Abs_Qty'] = df['Quantity']
-
-            trk_pv = pd.DataFrame(trk.pivot_table(values='Tyre_Serial', index=['Date','Tyre_Name'], aggfunc='count').to_records())
-            trk_pv['Quantity'] = trk_pv['Tyre_Serial']
-            trk_pv.drop("Tyre_Serial", axis=1, inplace=True)
-            trk_pv['Type'] = "OUT"
-            trk_pv['Abs_Qty'] = trk_pv['Quantity'] * -1
-
-            df = df.append(trk_pv)
-            df.sort_values("Date", inplace=True)
-            df['Year'] = df['Date'].dt.year
-            df['Month'] = df['Date'].dt.month
-            df['Month'] = df['Month'].apply(lambda x: calendar.month_abbr[x])
-
-            pv = df.pivot_table(values='Quantity', index=['Date'], columns=["Type"], aggfunc='sum', fill_value=0)
+    def plot_chart(self, load, draw, nrows=1, sharex=False, error="Error drawing chart"):
+        '''Runs load() on the task worker, then draws its result with draw(*axes, result) on a new canvas.
+        A chart requested while another is loading supersedes it'''
+        self._last_chart = (load, draw, nrows, sharex, error)
+        self._stale = False
 
-            cum_pv = df.pivot_table(values='Abs_Qty', index=['Date'], columns=["Tyre_Name"], aggfunc='sum', fill_value=0).cumsum()
+        def on_done(result):
+            fig, axes = self.new_canvas(nrows, sharex)
+            try:
+                draw(*np.atleast_1d(axes), result)
+            except Exception as e:
+                logger.exception(f"{error} - {e}")
+            fig.canvas.draw()
 
-            pv.plot(title="Tyre Inventory IN/OUT Quantity", ax = ax1, marker='o')
-            cum_pv.plot(title="Tyre usage trend", ax = ax2, marker='o', color=["r", "k", "c", "m"])
+        def on_error(e):
+            logger.error(f"{error} - {e}", exc_info=e)
+            fig, axes = self.new_canvas(nrows, sharex)
+            fig.canvas.draw()
 
-            for ax in [ax1, ax2]:
-                ax.legend(loc='best')
-                ax.grid('on', which='major', axis='both')
-                ax.tick_params(axis="x", labelrotation=0)
-        except Exception as e:
-            logger.exception(f"Error drawing tyre inventory usage - {e}")
+        self.controller.run_task("dashboard", load, on_done=on_done, on_error=on_error)
 
-        fig.canvas.draw()
+    def track_inv_tyre_usage(self):
+        '''Track daily tyres received and fitted, and the cumulative usage per tyre'''
+        self.plot_chart(lambda: self.controller.storage.movements(), draw_tyre_usage, nrows=2, sharex=True,
+                        error="Error drawing tyre inventory usage")
+
+    def plot_monthly_usage(self):
+        '''Track monthly tyres received and fitted, and the monthly purchase cost'''
+        self.plot_chart(lambda: self.controller.storage.rollup(), draw_monthly_usage, nrows=2, sharex=True,
+                        error="Error drawing monthly tyre usage")
+
+    def consumption_forecast(self, window):
+        '''Returns the consumption forecast over a rolling window of months, cached until the data changes.
+        Runs on the task worker'''
+        cube = self.controller.storage.rollup()
+        key = (json.dumps(cube.marks, sort_keys=True, default=str), window, datetime.now().strftime("%Y-%m"))
+        if key not in self._forecasts:
+            monthly = cube.query(by=['Month', 'Tyre_Name'], measures=['Quantity'], source="tracking")['Quantity'].unstack(fill_value=0)
+            stock = self.controller.storage.update_inventory().sort_index().iloc[-1]
+            self._forecasts = {key: consumption_forecast(monthly, stock, window=window)}
+        return self._forecasts[key]
+
+    def plot_forecast(self, window):
+        '''Track monthly tyre consumption against its rolling mean, and stock against reorder points'''
+        self.plot_chart(lambda: self.consumption_forecast(window),
+                        lambda ax1, ax2, result: draw_forecast(ax1, ax2, *result, window),
+                        nrows=2, error="Error drawing tyre forecast")
+
+    def show_reorder_report(self, window):
+        '''launch reorder report window once the forecast is computed'''
+        def on_error(e):
+            logger.error(f"Error computing tyre forecast - {e}", exc_info=e)
+            tkMessageBox.showerror("Error", "Error computing tyre forecast. Please contact developer.")
+
+        self.controller.run_task("reorder", self.consumption_forecast, window,
+                                 on_done=lambda result: self.reorder_report(window, *result), on_error=on_error)
+
+    def reorder_report(self, window, history, plan):
+        lines = []
+        for tyre, row in plan.iterrows():
+            status = f"REORDER {row['Suggested_Order']:.0f}" if row['Reorder'] else "OK"
+            lines.append(f"{tyre}: Stock {row['Stock']:.0f}, Uses {row['Monthly_Rate']:.1f}/month, Reorder Point {row['Reorder_Point']:.0f}, "
+                         f"Cover {row['Months_Of_Cover']:.1f} months - {status}")
+        MsgBox(title="Reorder Report", header=f"Tyre Reorder Report ({window} Month Window)", txtbox=True, txtboxwidth='90',
+               txtboxmessage="\n".join(lines), message="Reorder point: monthly rate x 1 month lead time + safety stock (95% service level)")
+
+    def load_tyre_lifecycles(self, vehicle_number=None):
+        '''Returns the tyre lifecycles of a vehicle, or of the fleet. Runs on the task worker'''
+        return tyre_lifecycles(self.controller.storage.read_tyre_events(vehicle_number=vehicle_number))
 
     def plot_tyre_mileage(self, vehicle_number):
         '''Track per vehicle tyre replacement mileage'''
+        self.plot_chart(lambda: self.load_tyre_lifecycles(vehicle_number),
+                        lambda ax, df: draw_tyre_mileage(ax, df, vehicle_number),
+                        error="Error drawing tyre inventory usage")
 
-        fig, ax = plt.subplots(tight_layout=True)
-        canvas = FigureCanvasTkAgg(fig, master=self)
-
-        # Clear Canvas
-        self.plot_widget.destroy()
-        self.toolbar.destroy()
-
-        # Create canvas
-        self.plot_widget = canvas.get_tk_widget()
-        self.plot_widget.place(anchor='n', relheight='0.68', relwidth='0.98', relx='0.5', rely='0.22')
-
-        plt.rcParams.update({'font.size': 7})
-        self.toolbar = NavigationToolbar2Tk(canvas, self, pack_toolbar=False)
-        self.toolbar.config(background='white')
-        self.toolbar.update()
-        self.toolbar.place(anchor='n', relheight='0.05', relwidth='0.98', relx='0.5', rely='0.891')
-
-        try:
-            df = pd.read_csv(TYRE_DB, parse_dates=['Date'])
-
-            pv = df[df['Vehicle_Number'] == vehicle_number].pivot_table(values='Vehicle_Mileage', index='Date', columns=['Tyre_Location'], aggfunc='mean')
-
-            dlist = []
-            md = pv.dropna().diff().mean().to_dict()
-            for k, v in md.items():
-                ddict = {"Tyre Location": k, "Tyre Average Mileage": v}
-                dlist.append(ddict)
+    def download_lifecycle_report(self):
+        '''Export the lifecycle of every tyre fitment in the fleet'''
+        exp_dir = tkFileDialog.askdirectory()
 
-            df = pd.DataFrame(dlist)
-            pv = df.pivot_table(values="Tyre Average Mileage", index='Tyre Location', aggfunc='mean')
+        if os.path.isdir(exp_dir):
+            logger.info(f"Export directory - [{exp_dir}]")
 
-            y_ulim = pv["Tyre Average Mileage"].max() + 100
-            y_llim = pv["Tyre Average Mileage"].min() - 500
+            def export():
+                df = self.load_tyre_lifecycles()
+                df.to_csv(os.path.join(exp_dir, LIFECYCLE_FILE_NAME), index=False)
+                return len(df)
 
-            pv.plot(kind='bar', ax=ax, grid=True, title=f"Mileage Per Tyre - {vehicle_number}", ylim=(y_llim, y_ulim))
-            ax.legend(loc="best", ncol=6)
+            def on_done(rows):
+                logger.info(f"Exported {rows} tyre lifecycles")
+                tkMessageBox.showinfo("Success", "File export Success")
 
-        except Exception as e:
-            logger.exception(f"Error drawing tyre inventory usage - {e}")
+            def on_error(e):
+                logger.error(f"Error exporting {LIFECYCLE_FILE_NAME} - {e}", exc_info=e)
+                tkMessageBox.showerror("Error", "File export error! Please contact developer.")
 
-        fig.canvas.draw()
+            self.controller.run_task("export", export, on_done=on_done, on_error=on_error)
+        else:
+            logger.error(f"Directory not selected, download operation skipped - {exp_dir}")
+            tkMessageBox.showinfo("Operation Cancelled", "Directory not selected. Export cancelled.")
 
     def plot_per_vehicle_mileage(self):
         '''Track per vehicle average mileage on replacement'''
-        fig, ax = plt.subplots(tight_layout=True)
-        canvas = FigureCanvasTkAgg(fig, master=self)
-
-        # Clear Canvas
-        self.plot_widget.destroy()
-        self.toolbar.destroy()
-
-        # Create canvas
-        self.plot_widget = canvas.get_tk_widget()
-        self.plot_widget.place(anchor='n', relheight='0.68', relwidth='0.98', relx='0.5', rely='0.22')
-        plt.rcParams.update({'font.size': 7})
-        self.toolbar = NavigationToolbar2Tk(canvas, self, pack_toolbar=False)
-        self.toolbar.config(background='white')
-        self.toolbar.update()
-        self.toolbar.place(anchor='n', relheight='0.05', relwidth='0.98', relx='0.5', rely='0.891')
-
-        try:
-            df = pd.read_csv(TYRE_DB, parse_dates=['Date'])
-            dlist = []
-            for veh in df['Vehicle_Number'].unique():
-                md = df[df['Vehicle_Number'] == veh].pivot_table(values="Vehicle_Mileage", index='Date', columns=['Vehicle_Number']).diff().reset_index(drop=True).mean().to_dict()
-                for k, v in md.items():
-                    ddict = {"Vehicle Number": k, "Average Tyre Mileage": v}
-                    dlist.append(ddict)
-
-            pv = pd.DataFrame(dlist)
-
-            y_ulim = pv["Average Tyre Mileage"].max() + 100
-            y_llim = pv["Average Tyre Mileage"].min() - 500
-            pv.set_index('Vehicle Number', drop=True).plot(kind='bar', ax=ax, title="Average Mileage Per Vehicle", ylim=(y_llim, y_ulim))
-            ax.legend(loc="best", ncol=6)
-
-            ax.grid('on', which='major', axis='both' )
-            ax.tick_params(axis="x", labelrotation=0)
-
-        except Exception as e:
-            logger.exception(f"Error drawing tyre inventory usage - {e}")
-
-        fig.canvas.draw()
+        self.plot_chart(lambda: fleet_mileage(self.controller.storage.read_tyre_events()), draw_vehicle_mileage,
+                        error="Error drawing tyre inventory usage")
 
 
 class ConfigPage(tk.Frame):
@@ -1815,24 +2195,20 @@ class ConfigPage(tk.Frame):
         if tkMessageBox.askyesno("Confirm?", f"Truck Number: {attrib['Truck_num']}\nTrailer Number: {attrib['Trailer_num']}\nDo you want to proceed?"):
             logger.info("User proceed")
 
-            tree = ET.parse(CONFIG_FILE)
-            root = tree.getroot()
+            root = self.controller.profiles.editable_root()
             for i in root:
                 if i.tag == 'Vehicle':
                     ET.SubElement(i, "VehicleProfile", attrib)
-                    dom = minidom.parseString(ET.tostring(root, encoding='utf8', method='xml'))
                 else:
                     pass
 
-            with open(CONFIG_FILE, 'w') as fw:
-                fw.writelines(line + "\n" for line in dom.toprettyxml().split("\n") if not line.strip() == "")
+            self.controller.profiles.write(root)
             logger.info(f"Data written into configuration - [{attrib}]")
         else:
             logger.info("User aborted")
             pass
 
         self.clear_vehicle_profile_ent()
-        self.controller.update_frames(ConfigPage)
 
     def clear_tyre_profile_ent(self):
         for wg, txt in self.default_tyre.items():
@@ -1859,24 +2235,20 @@ class ConfigPage(tk.Frame):
         if tkMessageBox.askyesno("Confirm?", f"Tyre Brand: {attrib['Tyre_brand']}\nTyre Name: {attrib['Tyre_name']}\nTyre Size: {attrib['Tyre_size']}\nDo you want to proceed?"):
             logger.info("User proceed")
 
-            tree = ET.parse(CONFIG_FILE)
-            root = tree.getroot()
+            root = self.controller.profiles.editable_root()
             for i in root:
                 if i.tag == 'Tyre':
                     ET.SubElement(i, "TyreProfile", attrib)
-                    dom = minidom.parseString(ET.tostring(root, encoding='utf8', method='xml'))
                 else:
                     pass
 
-            with open(CONFIG_FILE, 'w') as fw:
-                fw.writelines(line + "\n" for line in dom.toprettyxml().split("\n") if not line.strip() == "")
+            self.controller.profiles.write(root)
             logger.info(f"Data written into configuration - [{attrib}]")
         else:
             logger.info("User aborted")
             pass
 
         self.clear_tyre_profile_ent()
-        self.controller.update_frames(ConfigPage)
 
     def clear_employee_profile_ent(self):
         for wg, txt in self.default_employee.items():
@@ -1903,24 +2275,20 @@ class ConfigPage(tk.Frame):
         if tkMessageBox.askyesno("Confirm?", f"Employee Name: {attrib['Emp_name']}\nEmployee Contact: {attrib['Emp_contact']}\nDo you want to proceed?"):
             logger.info("User proceed")
 
-            tree = ET.parse(CONFIG_FILE)
-            root = tree.getroot()
+            root = self.controller.profiles.editable_root()
             for i in root:
                 if i.tag == 'Employee':
                     ET.SubElement(i, "EmployeeProfile", attrib)
-                    dom = minidom.parseString(ET.tostring(root, encoding='utf8', method='xml'))
                 else:
                     pass
 
-            with open(CONFIG_FILE, 'w') as fw:
-                fw.writelines(line + "\n" for line in dom.toprettyxml().split("\n") if not line.strip() == "")
+            self.controller.profiles.write(root)
             logger.info(f"Data written into configuration - [{attrib}]")
         else:
             logger.info("User aborted")
             pass
 
         self.clear_employee_profile_ent()
-        self.controller.update_frames(ConfigPage)
 
     def save_app_settings(self):
         '''Update app settings to systemconfig.xml file'''
@@ -1936,8 +2304,7 @@ class ConfigPage(tk.Frame):
         if tkMessageBox.askyesno("Confirm?", user_select_text):
             logger.info("User Proceed")
 
-            tree = ET.parse(CONFIG_FILE)
-            root = tree.getroot()
+            root = self.controller.profiles.editable_root()
 
             for el in list(root.findall("App")[0].iter()):
                 if el.tag == "AppSettings" and "Currency" in el.attrib.keys():
@@ -1948,7 +2315,7 @@ class ConfigPage(tk.Frame):
 
             attrib = {"Company": self.cfg_company_name_ent.get()}
             # Check if AppSettings with attrib containing "Company" is available
-            if len(root.findall("App")[0].findall("AppSettings")) != 2:
+            if not any("Company" in el.attrib for el in root.findall("App")[0].findall("AppSettings")):
                 for i in root:
                     if i.tag == 'App':
                         ET.SubElement(i, "AppSettings", attrib)
@@ -1960,10 +2327,7 @@ class ConfigPage(tk.Frame):
                     else:
                         pass
 
-            xmlstr = minidom.parseString(ET.tostring(root, encoding='utf8', method='xml')).toprettyxml(indent="\t")
-            with open(CONFIG_FILE, 'w') as fw:
-                fw.writelines(line + "\n" for line in xmlstr.split("\n") if not line.strip() == "")
-            self.controller.update_frames(ConfigPage)
+            self.controller.profiles.write(root)
         else:
             logger.info("User abort")
 
@@ -1973,7 +2337,7 @@ class ConfigPage(tk.Frame):
             for widget in self.display_port_lbf.winfo_children():
                 widget.destroy()
                 logger.info(f"Child destroyed - {widget}")
-        except Exception as e:
+        except Exception:
             logger.exception(f"Error destroying children - {widget}")
 
     def load_vehicle_data(self):
@@ -1983,8 +2347,7 @@ class ConfigPage(tk.Frame):
         self.clear_cfg_display_port()
 
         # Load Configuration data
-        tree = ET.parse(CONFIG_FILE)
-        root = tree.getroot()
+        root = self.controller.profiles.root
 
         self.head_lblf = ttk.Labelframe(self.display_port_lbf)
         self.head_lblf.configure(text='Vehicle Information', labelanchor='n')
@@ -2060,8 +2423,7 @@ class ConfigPage(tk.Frame):
         self.clear_cfg_display_port()
 
         # Load Configuration data
-        tree = ET.parse(CONFIG_FILE)
-        root = tree.getroot()
+        root = self.controller.profiles.root
 
         self.head_lblf = ttk.Labelframe(self.display_port_lbf)
         self.head_lblf.configure(text='Tyre Information', labelanchor='n')
@@ -2149,8 +2511,7 @@ class ConfigPage(tk.Frame):
         self.clear_cfg_display_port()
 
         # Load Configuration data
-        tree = ET.parse(CONFIG_FILE)
-        root = tree.getroot()
+        root = self.controller.profiles.root
 
         self.head_lblf = ttk.Labelframe(self.display_port_lbf)
         self.head_lblf.configure(text='Employee Information', labelanchor='n')
@@ -2269,8 +2630,7 @@ class ConfigPage(tk.Frame):
         logger.info(f"This is a {profile} profile - {prof_info}")
 
         # Load config file to check
-        tree = ET.parse(CONFIG_FILE)
-        root = tree.getroot()
+        root = self.controller.profiles.editable_root()
 
         # Checking total count difference between new and old
         profilenode = root.findall(profile)[0]
@@ -2302,9 +2662,7 @@ class ConfigPage(tk.Frame):
                     logger.info(f"Adding attribute to {profilenode} - {attrib}")
                     ET.SubElement(profilenode, f"{profile}Profile", attrib)
 
-                xmlstr = minidom.parseString(ET.tostring(root, encoding='utf8', method='xml'))
-                with open(CONFIG_FILE, 'w') as fw:
-                    fw.writelines(line+"\n" for line in xmlstr.toprettyxml().split("\n") if not line.strip() == "")
+                self.controller.profiles.write(root)
                 logger.info("Config updated")
 
             else:
@@ -2372,6 +2730,7 @@ if __name__ == "__main__":
 
     # Create logger
     logger = create_logger(__name__, __file__, __version__, 10)
+    logger.info(f"Modules imported in {time.perf_counter() - STARTUP_TIME:.3f}s")
 
     # Launch App
     app = TintApp()
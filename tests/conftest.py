@@ -0,0 +1,26 @@
+import os
+import shutil
+
+import pytest
+
+from traqwhel.paths import INV_FILE_NAME, INV_IN_FILE_NAME, TYRE_FILE_NAME
+
+SAMPLE_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Data")
+
+
+def copy_data(data_dir, kind="Sample"):
+    '''Copies the shipped "<name> - Sample.csv" (or "- Empty.csv") databases into data_dir'''
+    os.makedirs(data_dir, exist_ok=True)
+    for name in (INV_FILE_NAME, INV_IN_FILE_NAME, TYRE_FILE_NAME):
+        shutil.copy(os.path.join(SAMPLE_SOURCE, f"{os.path.splitext(name)[0]} - {kind}.csv"), os.path.join(data_dir, name))
+    return str(data_dir)
+
+
+@pytest.fixture
+def sample_dir(tmp_path):
+    return copy_data(tmp_path / "data")
+
+
+@pytest.fixture
+def empty_dir(tmp_path):
+    return copy_data(tmp_path / "data", "Empty")
@@ -0,0 +1,124 @@
+import os
+
+from traqwhel import csvio
+from traqwhel.csvio import append_ledger_rows, read_csv_since
+from traqwhel.paths import INV_IN_FILE_NAME, TYRE_FILE_NAME
+from traqwhel.schema import INV_IN_COLUMNS, TYRE_COLUMNS, TYRE_SCHEMA
+from traqwhel.storage import DataStore, open_storage
+from traqwhel.fitment import SerialIndex
+
+
+def edit_in_place(path, old, new, count=1):
+    '''Replaces the first count occurrences of old by new (same length) without changing the file
+    size, and moves the modification time on as a later save would'''
+    st = os.stat(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert len(old) == len(new) and old in data
+    with open(path, 'wb') as f:
+        f.write(data.replace(old, new, count))
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def tyre_event(serial):
+    return {'Date': "2021-11-01", 'Activity': "Tyre Replace", 'Reason': "Worn Out", 'Employee_Name': "Ahmad", 'Tyre_Name': "Tyre_BB",
+            'Tyre_Serial': serial, 'Vehicle_Number': "EIJ2866F", 'Vehicle_Type': "Truck", 'Vehicle_Mileage': 50000,
+            'Tyre_Location': "S1-R", 'Tyre_Size': "295/80R22.5"}
+
+
+def test_reads_appended_rows_only(sample_dir):
+    path = os.path.join(sample_dir, TYRE_FILE_NAME)
+    df, mark, full = read_csv_since(path)
+    assert full
+
+    append_ledger_rows(path, [tyre_event("X000001-01"), tyre_event("X000001-02")], TYRE_COLUMNS)
+    tail, mark, full = read_csv_since(path, mark)
+    assert not full
+    assert list(tail['Tyre_Serial']) == ["X000001-01", "X000001-02"]
+
+    tail, mark, full = read_csv_since(path, mark)
+    assert not full and len(tail) == 0
+
+
+def test_same_length_edit_is_a_rewrite(sample_dir):
+    path = os.path.join(sample_dir, TYRE_FILE_NAME)
+    df, mark, full = read_csv_since(path)
+    old = df['Tyre_Serial'].iloc[100]
+    new = old[:-1] + ("9" if old[-1] != "9" else "8")
+
+    edit_in_place(path, old.encode(), new.encode())
+    df, mark, full = read_csv_since(path, mark)
+    assert full and df['Tyre_Serial'].iloc[100] == new
+
+    # An edit of the last rows followed by an append is caught by the checksum before the mark
+    last = df['Tyre_Serial'].iloc[-1]
+    edit_in_place(path, last.encode(), last.lower().encode(), count=-1)
+    append_ledger_rows(path, [tyre_event("X000001-01")], TYRE_COLUMNS)
+    df, mark, full = read_csv_since(path, mark)
+    assert full and df['Tyre_Serial'].iloc[-2] == last.lower()
+
+
+def test_unchanged_file_is_not_read(sample_dir, monkeypatch):
+    path = os.path.join(sample_dir, TYRE_FILE_NAME)
+    df, mark, full = read_csv_since(path)
+    monkeypatch.setattr(csvio, "_window_crc", None)
+    tail, same, full = read_csv_since(path, mark)
+    assert not full and len(tail) == 0 and same == mark
+
+
+def test_datastore_and_snapshot_see_edits(sample_dir):
+    path = os.path.join(sample_dir, TYRE_FILE_NAME)
+    store = DataStore()
+    old = store.get(path, TYRE_SCHEMA)['Tyre_Serial'].iloc[100]
+    new = old[:-1] + ("9" if old[-1] != "9" else "8")
+
+    edit_in_place(path, old.encode(), new.encode())
+    # A restart loads the snapshot taken before the edit, it must not be trusted
+    df = DataStore().get(path, TYRE_SCHEMA)
+    assert df['Tyre_Serial'].iloc[100] == new
+
+    edit_in_place(path, new.encode(), old.encode())
+    assert store.get(path, TYRE_SCHEMA)['Tyre_Serial'].iloc[100] == old
+
+
+def test_serial_index_sees_edits(sample_dir, tmp_path):
+    path = os.path.join(sample_dir, TYRE_FILE_NAME)
+    index_file = str(tmp_path / "index.json")
+    df, mark, full = read_csv_since(path)
+    old = df['Tyre_Serial'].iloc[100]
+    new = old[:-1] + ("9" if old[-1] != "9" else "8")
+    SerialIndex(path, index_file).positions(old)
+
+    edit_in_place(path, old.encode(), new.encode())
+    index = SerialIndex(path, index_file)
+    assert 100 in index.positions(new)
+    assert 100 not in index.positions(old)
+
+
+def test_keeps_last_row_without_terminator(sample_dir):
+    path = os.path.join(sample_dir, INV_IN_FILE_NAME)
+    with open(path, 'rb') as f:
+        data = f.read()
+    rows = len(read_csv_since(path)[0])
+    with open(path, 'wb') as f:
+        f.write(data.rstrip(b"\r\n"))
+
+    storage = open_storage(sample_dir)
+    assert len(storage.read_receipts()) == rows
+    storage.append_receipt({'Datetime': "2021-11-01 08:00:00", 'Tyre_Name': "Tyre_BB", 'Quantity': 10, 'Cost/Unit': 500.0,
+                            'Total_Cost': 5000.0})
+    df = read_csv_since(path)[0]
+    assert len(df) == rows + 1 and df['Tyre_Name'].iloc[-1] == "Tyre_BB"
+
+
+def test_drops_torn_last_row(sample_dir):
+    path = os.path.join(sample_dir, INV_IN_FILE_NAME)
+    rows = len(read_csv_since(path)[0])
+    with open(path, 'ab') as f:
+        f.write(b"2021-11-01 08:00:00,Tyre_")
+    assert len(read_csv_since(path)[0]) == rows
+
+    append_ledger_rows(path, [{'Datetime': "2021-11-02 08:00:00", 'Tyre_Name': "Tyre_BB", 'Quantity': 10, 'Cost/Unit': 500.0,
+                               'Total_Cost': 5000.0}], INV_IN_COLUMNS)
+    df = read_csv_since(path)[0]
+    assert len(df) == rows + 1 and df['Datetime'].iloc[-1] == "2021-11-02 08:00:00"
@@ -0,0 +1,75 @@
+import os
+
+from traqwhel.csvio import append_ledger_rows
+from traqwhel.depots import FleetStorage
+from traqwhel.paths import INV_IN_FILE_NAME, TYRE_FILE_NAME, SQLITE_FILE_NAME
+from traqwhel.schema import TYRE_COLUMNS
+from traqwhel.storage import open_storage, migrate_csv_to_sqlite
+
+from conftest import copy_data
+from test_csvio import tyre_event
+
+
+def depot_files(data_dir):
+    return {name: os.stat(os.path.join(data_dir, name)).st_mtime_ns for name in os.listdir(data_dir)}
+
+
+def test_fleet_reuses_combined_data(tmp_path):
+    csv_dir = copy_data(tmp_path / "a")
+    sqlite_dir = copy_data(tmp_path / "b")
+    migrate_csv_to_sqlite(os.path.join(sqlite_dir, SQLITE_FILE_NAME), os.path.join(sqlite_dir, INV_IN_FILE_NAME),
+                          os.path.join(sqlite_dir, TYRE_FILE_NAME))
+    before = depot_files(csv_dir)
+
+    fleet = FleetStorage({"A": csv_dir, "B": sqlite_dir}, cache_dir=str(tmp_path / "cache"))
+    valuation = fleet.valuation()
+    fitments = fleet.fitments()
+    generation = fleet._generation
+    fleet.rollup()
+    fleet.distinct_values('Vehicle_Number')
+    fleet.serial_history("K194599-84")
+
+    assert fleet.valuation() is valuation
+    assert fleet.fitments() is fitments
+    assert fleet._generation == generation
+    # Everything derived from the csv depot went to the cache directory
+    assert depot_files(csv_dir) == before
+    assert len(os.listdir(tmp_path / "cache")) == 1
+
+    events = len(fleet.read_tyre_events())
+    append_ledger_rows(os.path.join(csv_dir, TYRE_FILE_NAME), [tyre_event("X000001-01")], TYRE_COLUMNS)
+    assert len(fleet.read_tyre_events()) == events + 1
+    assert fleet._generation == generation + 1
+    assert fleet.valuation() is not valuation
+
+    open_storage(sqlite_dir).append_tyre_events([tyre_event("X000002-01")])
+    assert len(fleet.read_tyre_events(depot="B")) == events // 2 + 1
+    assert fleet._generation == generation + 2
+
+
+def test_fleet_merges_depot_changes(tmp_path):
+    a_dir = copy_data(tmp_path / "a")
+    b_dir = copy_data(tmp_path / "b")
+    depot = open_storage(copy_data(tmp_path / "single"))
+    fleet = FleetStorage({"A": a_dir, "B": b_dir}, cache_dir=str(tmp_path / "cache"))
+
+    single = depot.update_inventory().sort_index().iloc[-1]
+    stock = fleet.update_inventory().sort_index().iloc[-1]
+    assert (stock == 2 * single).all()
+
+    receipts = len(depot.read_receipts())
+    open_storage(b_dir).append_receipt({'Datetime': "2021-11-01 08:00:00", 'Tyre_Name': "Tyre_BB", 'Quantity': 10,
+                                        'Cost/Unit': 500.0, 'Total_Cost': 5000.0})
+    event = tyre_event("X000001-01")
+    event.update(Vehicle_Number=" EIJ2866F ", Tyre_Name="Tyre_BB")
+    append_ledger_rows(os.path.join(a_dir, TYRE_FILE_NAME), [event], TYRE_COLUMNS)
+
+    stock = fleet.update_inventory().sort_index().iloc[-1]
+    assert stock['Tyre_BB'] == 2 * single['Tyre_BB'] + 10 - 1
+    assert (stock.drop('Tyre_BB') == 2 * single.drop('Tyre_BB')).all()
+
+    summary = fleet.depot_summary().set_index('Depot')
+    assert list(summary['Receipts']) == [receipts, receipts + 1]
+    events = fleet.read_tyre_events(depot="A", tyre_serial="X000001-01")
+    assert list(events['Vehicle_Number']) == ["EIJ2866F"]
+    assert fleet.fitments().vehicle("EIJ2866F")["S1-R"]['Tyre_Serial'] == "X000001-01"
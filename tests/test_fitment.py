@@ -0,0 +1,129 @@
+import os
+
+import pandas as pd
+
+from traqwhel import fitment
+from traqwhel.csvio import append_ledger_rows
+from traqwhel.fitment import SerialIndex, ValueCatalog, find_fitment_conflicts
+from traqwhel.paths import INV_IN_FILE_NAME, TYRE_FILE_NAME
+from traqwhel.schema import INV_IN_COLUMNS, TYRE_COLUMNS
+from traqwhel.storage import open_storage
+
+from test_csvio import tyre_event
+
+
+def rebuilt(path, tmp_path):
+    index = SerialIndex(path, str(tmp_path / "rebuilt.json"))
+    index.update()
+    return index.state
+
+
+def test_serial_index_appends_postings_to_log(sample_dir, tmp_path):
+    path = os.path.join(sample_dir, TYRE_FILE_NAME)
+    index = SerialIndex(path, str(tmp_path / "index.json"))
+    index.update()
+    saved = os.stat(index.index_file).st_mtime_ns
+
+    for i in range(3):
+        append_ledger_rows(path, [tyre_event(f"X00000{i}-01"), tyre_event("K194599-84")], TYRE_COLUMNS)
+        index.update()
+
+    assert os.stat(index.index_file).st_mtime_ns == saved
+    with open(index.log_file) as f:
+        assert len(f.readlines()) == 3
+
+    expected = rebuilt(path, tmp_path)
+    assert index.state == expected
+    # A new process replays the log on top of the saved index
+    reloaded = SerialIndex(path, index.index_file)
+    assert reloaded.positions("k194599-84 ") == expected['serials']["K194599-84"]
+    assert reloaded.state['rows'] == expected['rows']
+
+
+def test_serial_index_compacts_log(sample_dir, tmp_path, monkeypatch):
+    monkeypatch.setattr(SerialIndex, "COMPACT_ENTRIES", 2)
+    path = os.path.join(sample_dir, TYRE_FILE_NAME)
+    index = SerialIndex(path, str(tmp_path / "index.json"))
+    index.update()
+
+    for i in range(3):
+        append_ledger_rows(path, [tyre_event(f"X00000{i}-01")], TYRE_COLUMNS)
+        index.update()
+
+    # Two logged updates, then the third folds them into the index
+    assert not os.path.isfile(index.log_file)
+    assert SerialIndex(path, index.index_file).positions("X000002-01") == [index.state['rows'] - 1]
+
+
+def test_serial_index_recovers_from_torn_log(sample_dir, tmp_path):
+    path = os.path.join(sample_dir, TYRE_FILE_NAME)
+    index = SerialIndex(path, str(tmp_path / "index.json"))
+    index.update()
+    append_ledger_rows(path, [tyre_event("X000001-01")], TYRE_COLUMNS)
+    index.update()
+    with open(index.log_file, 'a') as f:
+        f.write('{"start": ')
+
+    append_ledger_rows(path, [tyre_event("X000002-01")], TYRE_COLUMNS)
+    reloaded = SerialIndex(path, index.index_file)
+    assert reloaded.positions("X000002-01") == [reloaded.state['rows'] - 1]
+    assert reloaded.state == rebuilt(path, tmp_path)
+    assert not os.path.isfile(reloaded.log_file)
+
+
+def test_value_catalog_reads_only_changed_databases(sample_dir, tmp_path, monkeypatch):
+    path = os.path.join(sample_dir, TYRE_FILE_NAME)
+    catalog = ValueCatalog(path, os.path.join(sample_dir, INV_IN_FILE_NAME), str(tmp_path / "catalog.json"))
+    vehicles = catalog.values("Vehicle_Number")
+
+    reads = []
+    read_csv_since = fitment.read_csv_since
+    monkeypatch.setattr(fitment, "read_csv_since", lambda *args, **kwargs: reads.append(args[0]) or read_csv_since(*args, **kwargs))
+    assert catalog.values("Vehicle_Number") == vehicles and not reads
+
+    event = tyre_event("X000001-01")
+    event['Vehicle_Number'] = "NEW0001A"
+    append_ledger_rows(path, [event], TYRE_COLUMNS)
+    assert catalog.values("Vehicle_Number") == vehicles + ["NEW0001A"]
+    assert path in reads
+
+
+def test_fitment_conflicts(sample_dir):
+    fitments = open_storage(sample_dir).fitments()
+    fitted = fitments.fitted_serials()
+    (moved, (veh, loc)), (kept, (veh2, loc2)), (vacated, (veh3, loc3)) = [(k, tuple(r)) for k, r in fitted.iloc[:3].iterrows()]
+
+    batch = pd.DataFrame([
+        [moved.lower(), "NEW0001A", "S1-L"],
+        ["X000001-01", "NEW0001A", "S1-R"],
+        ["X000002-01 ", "NEW0001A", "S2-L"],
+        ["x000002-01", "NEW0001A", "S2-R"],
+        [kept, veh2, loc2],
+        [vacated, "NEW0001A", "S3-L"],
+        ["X000003-01", veh3, loc3],
+    ], columns=['Tyre_Serial', 'Vehicle_Number', 'Tyre_Location'])
+    conflicts = find_fitment_conflicts(batch, fitments)
+
+    assert list(conflicts.index) == [0, 2, 3]
+    assert list(conflicts['Conflict']) == [f"Fitted on {veh} [{loc}]", "Entered more than once", "Entered more than once"]
+
+
+def test_value_catalog_values(empty_dir, tmp_path):
+    path = os.path.join(empty_dir, TYRE_FILE_NAME)
+    receipts = os.path.join(empty_dir, INV_IN_FILE_NAME)
+    catalog = ValueCatalog(path, receipts, str(tmp_path / "catalog.json"))
+    assert catalog.values("Vehicle_Number") == []
+
+    events = []
+    for vehicle, tyre in [("VEH0002B", "Tyre_BB"), (" VEH0001A ", "Tyre_AA"), ("VEH0002B", "Tyre_BB")]:
+        event = tyre_event("X000001-01")
+        event.update(Vehicle_Number=vehicle, Tyre_Name=tyre)
+        events.append(event)
+    append_ledger_rows(path, events, TYRE_COLUMNS)
+    append_ledger_rows(receipts, [{'Datetime': "2021-11-01 08:00:00", 'Tyre_Name': name, 'Quantity': 10, 'Cost/Unit': 500.0,
+                                   'Total_Cost': 5000.0} for name in ("Tyre_CC", "Tyre_AA")], INV_IN_COLUMNS)
+
+    assert catalog.values("Vehicle_Number") == ["VEH0002B", "VEH0001A"]
+    assert catalog.values("Tyre_Name") == ["Tyre_BB", "Tyre_AA", "Tyre_CC"]
+    # A new process reads the saved catalog
+    assert ValueCatalog(path, receipts, catalog.catalog_file).values("Tyre_Name") == ["Tyre_BB", "Tyre_AA", "Tyre_CC"]
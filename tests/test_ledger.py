@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from traqwhel.csvio import append_ledger_row
+from traqwhel.ledger import InventoryValuation, consumption_forecast, inventory_movements
+from traqwhel.paths import INV_IN_FILE_NAME
+from traqwhel.schema import INV_IN_COLUMNS
+from traqwhel.storage import open_storage
+
+
+def test_movements_balance_inventory(sample_dir):
+    storage = open_storage(sample_dir)
+    receipts, events = storage.read_receipts(), storage.read_tyre_events()
+    mv = inventory_movements(receipts, events)
+
+    assert (mv['Date'] == mv['Date'].dt.normalize()).all()
+    assert mv.loc[mv['Type'] == "IN", 'Quantity'].sum() == receipts['Quantity'].sum()
+    assert mv.loc[mv['Type'] == "OUT", 'Quantity'].sum() == events['Tyre_Name'].notna().sum()
+
+    inventory = storage.update_inventory()
+    net = mv[mv['Tyre_Name'].isin(inventory.columns)].groupby('Tyre_Name')['Movement'].sum()
+    assert (inventory.iloc[-1] == net.reindex(inventory.columns)).all()
+
+
+def test_valuation_incremental_matches_rebuild(sample_dir):
+    storage = open_storage(sample_dir)
+    storage.valuation()
+    append_ledger_row(os.path.join(sample_dir, INV_IN_FILE_NAME),
+                      {'Datetime': "2021-11-01 08:00:00", 'Tyre_Name': "Tyre_BB", 'Quantity': 10, 'Cost/Unit': 500.0, 'Total_Cost': 5000.0},
+                      INV_IN_COLUMNS)
+    incremental = storage.valuation()
+
+    rebuilt = InventoryValuation()
+    rebuilt.apply(storage.read_receipts(), storage.read_tyre_events())
+    assert np.allclose(incremental.stock_values().select_dtypes('number'), rebuilt.stock_values().select_dtypes('number'), equal_nan=True)
+
+
+def reference_valuation(days, carried=1):
+    '''Values a daily receipt of 4 tyres and 4 fitments lot by lot, with carried extra tyres
+    received on the first day. Returns (FIFO cost, moving-average cost) of the fitments and
+    (stock, FIFO value, average unit cost) of the stock left'''
+    lots, stock, avg, fifo_cost, avg_cost = [], 0, 0.0, 0.0, 0.0
+    for day in range(days):
+        qty, unit = 4 + (carried if day == 0 else 0), 500.0 + (day % 7) * 10
+        avg = (stock * avg + qty * unit) / (stock + qty)
+        stock += qty
+        lots.append([qty, unit])
+        for _ in range(4):
+            fifo_cost += lots[0][1]
+            avg_cost += avg
+            lots[0][0] -= 1
+            if not lots[0][0]:
+                lots.pop(0)
+            stock -= 1
+    return (fifo_cost, avg_cost), (stock, sum(q * u for q, u in lots), avg)
+
+
+def test_valuation_long_history_matches_reference():
+    days = 600
+    dates = pd.date_range("2020-01-01 08:00", periods=days, freq="D")
+    receipts = pd.DataFrame({'Datetime': dates, 'Tyre_Name': "Tyre_AA", 'Quantity': [5.0] + [4.0] * (days - 1)})
+    receipts['Total_Cost'] = receipts['Quantity'] * (500.0 + (np.arange(days) % 7) * 10)
+    events = pd.DataFrame({'Date': dates.repeat(4) + pd.Timedelta(hours=2), 'Tyre_Name': "Tyre_AA"})
+
+    valuation = InventoryValuation()
+    valuation.apply(receipts, events)
+    (fifo_cost, avg_cost), (stock, fifo_value, avg) = reference_valuation(days)
+
+    values = valuation.stock_values().loc["Tyre_AA"]
+    assert values['Stock'] == stock == 1
+    assert np.isclose(values['FIFO_Value'], fifo_value)
+    assert np.isclose(values['Average_Unit_Cost'], avg)
+    monthly = valuation.monthly_consumption()
+    assert np.isclose(monthly['FIFO_Cost'].sum(), fifo_cost)
+    assert np.isclose(monthly['Average_Cost'].sum(), avg_cost)
+
+
+def test_consumption_forecast(sample_dir):
+    storage = open_storage(sample_dir)
+    cube = storage.rollup()
+    monthly = cube.query(by=['Month', 'Tyre_Name'], measures=['Quantity'], source="tracking")['Quantity'].unstack(fill_value=0)
+    history, plan = consumption_forecast(monthly, storage.update_inventory().sort_index().iloc[-1], window=6)
+    assert set(plan.index) == set(monthly.columns)
+    assert (plan['Suggested_Order'] >= 0).all()
+
+
+def test_consumption_forecast_plan():
+    monthly = pd.DataFrame({'Tyre_AA': [2, 4, 6], 'Tyre_BB': [0, 0, 3]}, index=["2021-01", "2021-02", "2021-03"])
+    stock = pd.Series({'Tyre_AA': 5, 'Tyre_BB': 10, 'Tyre_CC': 1})
+    history, plan = consumption_forecast(monthly, stock, window=3, until="2021-03")
+
+    # Tyre_AA: mean 4, std 2 / Tyre_BB: mean 1, std sqrt(3) / Tyre_CC: never fitted
+    assert list(plan.index) == ['Tyre_AA', 'Tyre_BB', 'Tyre_CC']
+    assert np.allclose(plan['Monthly_Rate'], [4, 1, 0])
+    assert np.allclose(plan['Monthly_Std'], [2, np.sqrt(3), 0])
+    assert np.allclose(plan['Reorder_Point'], [4 + 1.65 * 2, 1 + 1.65 * np.sqrt(3), 0])
+    assert np.allclose(plan['Months_Of_Cover'], [1.25, 10, np.nan], equal_nan=True)
+    assert list(plan['Reorder']) == [True, False, False]
+    assert list(plan['Suggested_Order']) == [7, 0, 0]
+    assert len(history) == 9
+
+    # Idle months up to until count as zero consumption
+    history, plan = consumption_forecast(monthly, stock, window=3, until="2021-05")
+    assert np.allclose(plan['Monthly_Rate'], [2, 1, 0])
+    assert list(history.loc[history['Tyre_Name'] == 'Tyre_AA', 'Fitted']) == [2, 4, 6, 0, 0]
@@ -0,0 +1,25 @@
+import os
+
+from traqwhel.report import NO_DATA, generate_report, main
+
+
+def test_report_on_empty_data(empty_dir, tmp_path):
+    before = sorted(os.listdir(empty_dir))
+    out_dir = str(tmp_path / "reports")
+    files, errors = generate_report(empty_dir, out_dir, workers=1)
+
+    assert files == []
+    assert len(errors) == 5 and all(error == NO_DATA for path, error in errors)
+    assert sorted(os.listdir(empty_dir)) == before
+    assert main(["--data", empty_dir, "--out", out_dir, "--workers", "1"]) == 0
+
+
+def test_report_leaves_data_directory_untouched(sample_dir, tmp_path):
+    before = {name: os.stat(os.path.join(sample_dir, name)).st_mtime_ns for name in os.listdir(sample_dir)}
+    out_dir = str(tmp_path / "reports")
+    files, errors = generate_report(sample_dir, out_dir, dpi=30, workers=1)
+
+    assert errors == []
+    assert os.path.join(out_dir, "tyre_forecast.png") in files
+    assert len(os.listdir(os.path.join(out_dir, "tyre_mileage"))) > 0
+    assert {name: os.stat(os.path.join(sample_dir, name)).st_mtime_ns for name in os.listdir(sample_dir)} == before
@@ -0,0 +1,43 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from traqwhel import schema
+from traqwhel.schema import parse_date_column, parse_date_value
+from traqwhel.storage import open_storage
+
+
+def test_date_cache_shared_by_threads(monkeypatch):
+    monkeypatch.setattr(schema, "DATE_CACHE_SIZE", 50)
+    days = pd.date_range("2015-01-01", periods=400, freq="D")
+
+    def parse(offset):
+        chunk = days[offset:offset + 40]
+        return (parse_date_column(pd.Series(chunk.strftime("%d/%m/%Y"))) == chunk).all()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert all(pool.map(parse, [i % 360 for i in range(200)]))
+
+
+def test_parses_every_date_format():
+    values = pd.Series(["2021-06-12", "2021-06-12 15:14:06", "12/06/2021", "12/06/2021 15:14:06", "12/06/2021 15:14",
+                        "12-06-2021", "12-06-2021 15:14:06", "2021/06/12", "2021/06/12 15:14:06", "12.06.2021",
+                        " 03/04/2021 ", "2021-02-30", "not a date", None])
+    expected = [pd.Timestamp(v) if v else pd.NaT for v in
+                ["2021-06-12", "2021-06-12 15:14:06", "2021-06-12", "2021-06-12 15:14:06", "2021-06-12 15:14:00",
+                 "2021-06-12", "2021-06-12 15:14:06", "2021-06-12", "2021-06-12 15:14:06", "2021-06-12",
+                 "2021-04-03", None, None, None]]
+    assert list(parse_date_column(values)) == expected
+
+
+def test_parse_date_value():
+    assert parse_date_value("01/02/2021") == pd.Timestamp("2021-02-01")
+    with pytest.raises(ValueError):
+        parse_date_value("13/13/2021")
+
+
+def test_sample_dates_parse(sample_dir):
+    storage = open_storage(sample_dir)
+    assert storage.read_tyre_events()['Date'].notna().all()
+    assert storage.read_receipts()['Datetime'].notna().all()
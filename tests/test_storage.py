@@ -0,0 +1,68 @@
+import os
+
+import pandas as pd
+import pytest
+
+from traqwhel.paths import INV_IN_FILE_NAME, TYRE_FILE_NAME, SQLITE_FILE_NAME
+from traqwhel.storage import CsvStorage, SqliteStorage, open_storage, migrate_csv_to_sqlite
+
+from test_csvio import tyre_event
+
+
+@pytest.fixture
+def backends(sample_dir):
+    csv_storage = open_storage(sample_dir)
+    db_file = os.path.join(sample_dir, SQLITE_FILE_NAME)
+    migrate_csv_to_sqlite(db_file, os.path.join(sample_dir, INV_IN_FILE_NAME), os.path.join(sample_dir, TYRE_FILE_NAME))
+    return csv_storage, SqliteStorage(db_file)
+
+
+@pytest.mark.parametrize("start, end", [
+    ("2015-08-17", "2015-08-17"),
+    ("2015-08-17", "2015-09-30"),
+    ("2015-08-16 10:00", "2015-08-17 10:00"),
+    (None, "2015-08-17"),
+    ("2016-01-01", None),
+])
+def test_tyre_event_date_range_parity(backends, start, end):
+    csv_storage, sqlite_storage = backends
+    expected = csv_storage.read_tyre_events(start=start, end=end)
+    result = sqlite_storage.read_tyre_events(start=start, end=end)
+    assert len(expected) > 0
+    assert len(result) == len(expected)
+    pd.testing.assert_series_equal(result['Date'], expected['Date'], check_dtype=False)
+
+
+def test_receipt_date_range_parity(backends):
+    csv_storage, sqlite_storage = backends
+    dates = csv_storage.read_receipts()['Datetime']
+    start, end = dates.iloc[3], dates.iloc[10]
+    expected = csv_storage.read_receipts(start=start, end=end)
+    assert len(sqlite_storage.read_receipts(start=start, end=end)) == len(expected) > 0
+
+
+def test_open_storage_picks_backend(backends, sample_dir):
+    assert isinstance(open_storage(sample_dir), SqliteStorage)
+    os.remove(os.path.join(sample_dir, SQLITE_FILE_NAME))
+    assert isinstance(open_storage(sample_dir), CsvStorage)
+
+
+def test_inventory_parity_with_blank_tyre_size(backends):
+    csv_storage, sqlite_storage = backends
+    event = tyre_event("X000001-01")
+    event['Tyre_Size'] = None
+    for storage in backends:
+        storage.append_tyre_events([event])
+
+    expected = csv_storage.update_inventory()
+    result = sqlite_storage.update_inventory()
+    pd.testing.assert_frame_equal(result.sort_index(axis=1), expected.sort_index(axis=1), check_dtype=False)
+
+
+def test_serial_history_parity(backends):
+    csv_storage, sqlite_storage = backends
+    serial = csv_storage.read_tyre_events()['Tyre_Serial'].iloc[100]
+    expected = csv_storage.serial_history(serial.lower())
+    result = sqlite_storage.serial_history(serial.lower())
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True), check_categorical=False)
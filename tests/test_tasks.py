@@ -0,0 +1,29 @@
+import threading
+
+from traqwhel.tasks import TaskRunner
+
+
+def test_queued_jobs_are_not_superseded():
+    runner = TaskRunner()
+    gate = threading.Event()
+    results = []
+    runner.submit("chart", gate.wait)
+    runner.submit(None, lambda: 1, on_done=results.append)
+    runner.submit(None, lambda: 2, on_done=results.append)
+    runner.submit("chart", lambda: "latest", on_done=results.append)
+    gate.set()
+    while runner.poll():
+        pass
+    runner.shutdown()
+    assert sorted(results, key=str) == [1, 2, "latest"]
+
+
+def test_shutdown_waits_for_queued_jobs():
+    runner = TaskRunner()
+    gate = threading.Event()
+    written = []
+    runner.submit(None, gate.wait)
+    runner.submit(None, written.append, "row")
+    threading.Timer(0.1, gate.set).start()
+    runner.shutdown()
+    assert written == ["row"]
@@ -0,0 +1,34 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python package                                   #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/__init__.py
+__version__ = "1.0.0"
+"""
+Headless core of the Tyre Inventory & Tracking App: storage backends, inventory ledger,
+tyre fitment and mileage analytics. Importable without tkinter or matplotlib, Tint_App.py
+is the GUI on top of it.
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+from .storage import CsvStorage, SqliteStorage, DataStore, open_storage, migrate_csv_to_sqlite
+from .depots import FleetStorage
+from .ledger import (MonthlyInventoryLedger, RollupCube, InventoryValuation, inventory_movements, cumulative_inventory,
+                     monthly_inventory, consumption_forecast)
+from .fitment import FitmentIndex, SerialIndex, ValueCatalog, find_fitment_conflicts, normalize_serial
+from .mileage import fleet_mileage, tyre_lifecycles
+from .profiles import ProfileRegistry
+
+__all__ = ["CsvStorage", "SqliteStorage", "DataStore", "open_storage", "migrate_csv_to_sqlite", "FleetStorage",
+           "MonthlyInventoryLedger", "RollupCube", "InventoryValuation", "inventory_movements", "cumulative_inventory",
+           "monthly_inventory", "consumption_forecast", "FitmentIndex", "SerialIndex", "ValueCatalog",
+           "find_fitment_conflicts", "normalize_serial", "fleet_mileage", "tyre_lifecycles", "ProfileRegistry"]
@@ -0,0 +1,109 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/charts.py
+"""
+Dashboard charts drawn onto caller supplied matplotlib axes, shared by the GUI and the batch report
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import pandas as pd
+
+# ----- Methods ----- #
+
+FONT_SIZE = 7
+
+
+def draw_inventory_trend(ax, inventory, as_of):
+    '''Bar chart of the stock of each tyre over the last 6 months of the inventory ledger'''
+    inventory.sort_index().tail(6).plot(kind='bar', ax=ax, grid=True)
+    ax.tick_params(axis="x", labelrotation=0)
+    ax.set_xlabel("Time")
+    ax.set_ylabel("Count of Tyres")
+    ax.set_title("Tyre Inventory Trend as of {}".format(as_of))
+
+
+def draw_tyre_usage(ax1, ax2, movements):
+    '''Daily IN/OUT quantities on ax1 and the cumulative stock movement per tyre on ax2'''
+    pv = movements.pivot_table(values='Quantity', index=['Date'], columns=["Type"], aggfunc='sum', fill_value=0)
+    cum_pv = movements.pivot_table(values='Movement', index=['Date'], columns=["Tyre_Name"], aggfunc='sum', fill_value=0).cumsum()
+
+    pv.plot(title="Tyre Inventory IN/OUT Quantity", ax=ax1, marker='o')
+    cum_pv.plot(title="Tyre usage trend", ax=ax2, marker='o', color=["r", "k", "c", "m"])
+
+    for ax in [ax1, ax2]:
+        ax.legend(loc='best')
+        ax.grid('on', which='major', axis='both')
+        ax.tick_params(axis="x", labelrotation=0)
+
+
+def draw_monthly_usage(ax1, ax2, cube):
+    '''Monthly tyres received and fitted on ax1 and the monthly purchase cost per tyre on ax2, from a RollupCube'''
+    pv = pd.DataFrame({"IN": cube.query(source="receipts")['Quantity'],
+                       "OUT": cube.query(source="tracking")['Quantity']}).fillna(0).sort_index()
+    cost = cube.query(by=['Month', 'Tyre_Name'], measures=['Cost'], source="receipts")['Cost'].unstack(fill_value=0).reindex(pv.index, fill_value=0)
+
+    pv.plot(kind='bar', title="Monthly Tyre IN/OUT Quantity", ax=ax1)
+    cost.plot(kind='bar', stacked=True, title="Monthly Tyre Purchase Cost", ax=ax2)
+
+    for ax in [ax1, ax2]:
+        ax.legend(loc='best')
+        ax.grid('on', which='major', axis='y')
+        ax.tick_params(axis="x", labelrotation=90)
+
+
+def draw_forecast(ax1, ax2, history, plan, window):
+    '''Last 24 months of tyres fitted against the rolling mean on ax1, stock against reorder points on ax2.
+    history and plan are as returned by consumption_forecast'''
+    history = history[history['Month'] >= history['Month'].unique()[-24:][0]]
+
+    fitted = history.pivot(index='Month', columns='Tyre_Name', values='Fitted')
+    mean = history.pivot(index='Month', columns='Tyre_Name', values='Rolling_Mean')
+    fitted.plot(title=f"Tyres Fitted Per Month and {window} Month Rolling Mean", ax=ax1, marker='o')
+    ax1.set_prop_cycle(None)
+    mean.plot(ax=ax1, linestyle='--', legend=False)
+
+    plan[['Stock', 'Reorder_Point', 'Safety_Stock']].plot(kind='bar', title="Stock and Reorder Point", ax=ax2)
+
+    for ax in [ax1, ax2]:
+        ax.legend(loc='best')
+        ax.grid('on', which='major', axis='both')
+        ax.tick_params(axis="x", labelrotation=0)
+
+
+def draw_vehicle_mileage(ax, fleet):
+    '''Bar chart of the average mileage between tyre replacements of each vehicle, from fleet_mileage'''
+    pv = fleet[['Vehicle_Number', 'Average_Mileage']].rename(columns={'Vehicle_Number': "Vehicle Number", 'Average_Mileage': "Average Tyre Mileage"})
+
+    y_ulim = pv["Average Tyre Mileage"].max() + 100
+    y_llim = pv["Average Tyre Mileage"].min() - 500
+    pv.set_index('Vehicle Number', drop=True).plot(kind='bar', ax=ax, title="Average Mileage Per Vehicle", ylim=(y_llim, y_ulim))
+    ax.legend(loc="best", ncol=6)
+
+    ax.grid('on', which='major', axis='both')
+    ax.tick_params(axis="x", labelrotation=0)
+
+
+def draw_tyre_mileage(ax, lifecycles, vehicle_number):
+    '''Bar chart of the average distance covered by the tyres at each location of a vehicle, from tyre_lifecycles'''
+    df = lifecycles.dropna(subset=['Distance'])
+    df = df.rename(columns={'Tyre_Location': "Tyre Location", 'Distance': "Tyre Average Mileage"})
+    pv = df.pivot_table(values="Tyre Average Mileage", index='Tyre Location', aggfunc='mean', observed=True)
+
+    y_ulim = pv["Tyre Average Mileage"].max() + 100
+    y_llim = pv["Tyre Average Mileage"].min() - 500
+
+    pv.plot(kind='bar', ax=ax, grid=True, title=f"Mileage Per Tyre - {vehicle_number}", ylim=(y_llim, y_ulim))
+    ax.legend(loc="best", ncol=6)
@@ -0,0 +1,199 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/csvio.py
+"""
+Append-only csv ledger files: safe appends, torn tail recovery and high-water mark reads
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import os
+import io
+import csv
+import zlib
+import logging
+
+import pandas as pd
+
+from .schema import parse_date_column, format_ledger_value
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_header(line):
+    '''Returns the columns of a csv header line (bytes)'''
+    return next(csv.reader([line.decode('utf-8-sig').rstrip("\r\n")]))
+
+
+def _is_complete_row(fragment, header):
+    '''Whether an unterminated last line (bytes) holds a whole row, i.e. it parses to as many
+    fields as the header. Hand-edited files often lose the terminator of their last row'''
+    try:
+        rows = list(csv.reader([fragment.rstrip(b"\r").decode('utf-8')]))
+    except (UnicodeDecodeError, csv.Error):
+        return False
+    return len(rows) == 1 and len(rows[0]) == len(header)
+
+
+def recover_torn_tail(path, header=None, terminator="\n"):
+    '''Repairs the last line of a file when it has no line terminator.
+    With the header columns of a csv ledger, a last line that parses to all the columns is a
+    complete row that lost its terminator: the terminator is written and the row kept.
+    Otherwise the trailing bytes after the last terminator belong to a write interrupted
+    by a crash and are truncated.
+    Returns the bytes removed (b"" if the file was clean or the row was kept)'''
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return b""
+
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return b""
+
+        # Walk backwards in blocks to find the last complete line
+        cut = 0
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            idx = f.read(step).rfind(b"\n")
+            if idx != -1:
+                cut = pos + idx + 1
+                break
+
+        f.seek(cut)
+        torn = f.read()
+        if cut > 0 and header is not None and _is_complete_row(torn, header):
+            logger.info(f"Added missing line terminator after the last row of {path}")
+            f.write(b"\n" if torn.endswith(b"\r") else terminator.encode())
+            torn = b""
+        else:
+            f.truncate(cut)
+        f.flush()
+        os.fsync(f.fileno())
+
+    return torn
+
+
+def read_ledger_header(path):
+    '''Returns the header columns and line terminator of a csv ledger.
+    Returns (None, None) if the file is missing or empty'''
+    if not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return None, None
+
+    with open(path, 'rb') as f:
+        line = f.readline()
+
+    terminator = "\r\n" if line.endswith(b"\r\n") else "\n"
+    return _parse_header(line), terminator
+
+
+def append_ledger_rows(path, rows, columns):
+    '''Appends a batch of rows (list of dict) to a csv ledger in one buffered write,
+    without reading or rewriting existing rows.
+    path: csv ledger file, created with a header if missing or empty
+    rows: list of dict of column name to value, written in the order of the file header
+    columns: default column order used when the header has to be written'''
+    if not rows:
+        return
+
+    header, terminator = read_ledger_header(path)
+
+    if header is None:
+        header = list(columns)
+        terminator = "\r\n" if os.name == 'nt' else "\n"
+        write_header = True
+    else:
+        torn = recover_torn_tail(path, header, terminator)
+        if torn:
+            logger.warning(f"Recovered torn last line in {path} - dropped {torn!r}")
+        write_header = False
+
+    unknown = sorted(set(k for row in rows for k in row.keys()) - set(header))
+    if unknown:
+        raise ValueError(f"Columns {unknown} not found in {path} header {header}")
+
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator=terminator)
+    if write_header:
+        writer.writerow(header)
+    writer.writerows([format_ledger_value(row.get(c)) for c in header] for row in rows)
+
+    with open(path, 'ab') as f:
+        f.write(buf.getvalue().encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def append_ledger_row(path, row, columns):
+    '''Appends a single row (dict) to a csv ledger, see append_ledger_rows()'''
+    append_ledger_rows(path, [row], columns)
+
+
+MARK_WINDOW = 1 << 16
+
+
+def _window_crc(f, end):
+    '''Returns the crc32 of the MARK_WINDOW bytes before end of an open binary file'''
+    f.seek(max(end - MARK_WINDOW, 0))
+    return zlib.crc32(f.read(end - f.tell()))
+
+
+def read_csv_since(path, mark=None, **kwargs):
+    '''Reads the rows appended to a csv ledger since a previous high-water mark.
+    path: csv ledger file
+    mark: dict returned by a previous call, or None to read the whole file
+    kwargs: passed on to pd.read_csv
+    Returns (df, mark, full) - full is True when the whole file had to be read because
+    there was no mark or the file was rewritten: it shrank, it was modified without growing,
+    or the crc32 of the MARK_WINDOW bytes before the mark no longer matches (an edit of the
+    last rows). An unchanged file (same size and mtime) is not read at all, so a check costs
+    the same whatever the size of the file.
+    Columns listed in parse_dates are parsed with parse_date_column().
+    A last line without a line terminator is read when it holds a whole row (see
+    recover_torn_tail()), otherwise it is a torn write and left unread.'''
+    parse_dates = kwargs.pop('parse_dates', None) or []
+    with open(path, 'rb') as f:
+        mtime = os.fstat(f.fileno()).st_mtime_ns
+        header = f.readline()
+        data_start = f.tell()
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+
+        full = True
+        start = data_start
+        if mark and 'window_crc' in mark and data_start <= mark.get('offset', -1) <= size:
+            offset = mark['offset']
+            if offset == size and mark.get('mtime') == mtime or offset < size and _window_crc(f, offset) == mark['window_crc']:
+                full = False
+                start = offset
+
+        f.seek(start)
+        data = f.read(size - start)
+        tail = data[data.rfind(b"\n") + 1:]
+        if tail and not _is_complete_row(tail, _parse_header(header)):
+            data = data[:-len(tail)]
+        end = start + len(data)
+        window_crc = mark['window_crc'] if not full and end == start else _window_crc(f, end)
+
+    new_mark = {'offset': end, 'window_crc': window_crc, 'mtime': mtime}
+
+    df = pd.read_csv(io.BytesIO(header + data), **kwargs)
+    for col in parse_dates:
+        df[col] = parse_date_column(df[col])
+    return df, new_mark, full
@@ -0,0 +1,200 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/depots.py
+"""
+Fleet view: read-only storage consolidating the data directories of several depots
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import os
+import re
+import zlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from .paths import INV_IN_FILE_NAME, TYRE_FILE_NAME, SQLITE_FILE_NAME, CACHE_SOURCE
+from .schema import INV_SCHEMA, INV_IN_SCHEMA, TYRE_SCHEMA, apply_schema, filter_frame
+from .storage import open_storage
+from .ledger import RollupCube, InventoryValuation, inventory_movements, monthly_inventory
+from .fitment import FitmentIndex
+
+logger = logging.getLogger(__name__)
+
+# ----- Methods ----- #
+
+DEPOT_COLUMN = "Depot"
+
+
+def is_depot_dir(data_source):
+    '''Returns True if the directory holds a depot's tracking database (csv or SQLite)'''
+    return any(os.path.isfile(os.path.join(data_source, f)) for f in (TYRE_FILE_NAME, INV_IN_FILE_NAME, SQLITE_FILE_NAME))
+
+
+def depot_cache_dir(cache_dir, depot):
+    '''Returns the cache directory of a depot under cache_dir, named after the depot'''
+    safe = re.sub(r"[^\w.-]+", "_", depot.strip()) or "_"
+    return os.path.join(cache_dir, f"{safe}-{zlib.crc32(depot.encode('utf-8')):08x}")
+
+
+def normalize_depot_frame(df, depot):
+    '''Returns a copy of a depot's receipt or tracking frame with its text columns stripped of
+    surrounding whitespace and the depot name as first column, ready to concatenate with
+    other depots. Categorical columns come back as object and are re-typed after the concat'''
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) or df[col].dtype == object:
+            values = df[col].astype(object)
+            df[col] = values.where(values.isna(), values.astype(str).str.strip())
+    df.insert(0, DEPOT_COLUMN, depot)
+    return df
+
+
+def combine_depot_frames(frames, schema):
+    '''Concatenates normalized depot frames into one frame typed by schema, with a categorical Depot column'''
+    df = pd.concat(frames, ignore_index=True)
+    return apply_schema(df, dict(schema, **{DEPOT_COLUMN: 'category'}))
+
+
+class FleetStorage():
+    '''
+    Read-only storage backend over the data directories of several depots.
+
+    Every depot keeps its own backend (csv or SQLite, with its own caches and indexes). Reads
+    fan out over a thread pool with one worker per depot, the receipts and tracking events of
+    all depots are normalized into one fleet-wide frame with a Depot column and the ledger,
+    valuation and fitment engines run on top of it. The combined frames are only rebuilt when
+    the data version of a depot changed. Records are entered at each depot, so appends are
+    refused, and the snapshots and indexes of csv depots are kept under cache_dir, one
+    directory per depot, so nothing is written into the depots' data directories.
+    '''
+
+    name = "fleet"
+
+    def __init__(self, depots, workers=None, cache_dir=CACHE_SOURCE):
+        '''depots: {depot name: data directory}'''
+        if not depots:
+            raise ValueError("No depot data directories configured")
+        self.depots = {name: open_storage(data_source, cache_dir=depot_cache_dir(cache_dir, name)) for name, data_source in depots.items()}
+        self.workers = workers or len(self.depots)
+        self._versions = None
+        self._receipts = None
+        self._events = None
+        self._generation = 0
+        self._fitments = None
+        self._fitment_generation = None
+        self._valuation = None
+        self._valuation_generation = None
+
+    def _map(self, func):
+        '''Calls func(name, storage) for every depot over the thread pool, returns the results in depot order'''
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(lambda item: func(*item), self.depots.items()))
+
+    def _frames(self):
+        '''Returns the fleet-wide (receipts, events), re-combined only when the data version of a depot changed'''
+        versions = self._map(lambda name, storage: storage.data_version())
+        if versions != self._versions:
+            parts = self._map(lambda name, storage: (storage.read_receipts(), storage.read_tyre_events()))
+            names = list(self.depots)
+            self._receipts = combine_depot_frames([normalize_depot_frame(r, name) for name, (r, e) in zip(names, parts)], INV_IN_SCHEMA)
+            self._events = combine_depot_frames([normalize_depot_frame(e, name) for name, (r, e) in zip(names, parts)], TYRE_SCHEMA)
+            self._generation += 1
+            self._versions = versions
+            logger.info(f"Fleet data combined from {len(names)} depots - {len(self._receipts)} receipts, {len(self._events)} tyre events")
+        return self._receipts, self._events
+
+    def read_receipts(self, tyre_name=None, start=None, end=None, depot=None):
+        return filter_frame(self._frames()[0], 'Datetime', start, end, Tyre_Name=tyre_name, Depot=depot)
+
+    def read_tyre_events(self, vehicle_number=None, tyre_serial=None, tyre_name=None, start=None, end=None, depot=None):
+        return filter_frame(self._frames()[1], 'Date', start, end, Vehicle_Number=vehicle_number, Tyre_Serial=tyre_serial,
+                            Tyre_Name=tyre_name, Depot=depot)
+
+    def vehicle_numbers(self):
+        return self.distinct_values('Vehicle_Number')
+
+    def distinct_values(self, column):
+        '''Returns the distinct values of Vehicle_Number, Tyre_Name, Employee_Name or Tyre_Location across the depots'''
+        depot_values = self._map(lambda name, storage: storage.distinct_values(column))
+        return list(dict.fromkeys(value for values in depot_values for value in values))
+
+    def append_receipt(self, row):
+        raise PermissionError("The fleet view is read only, receipts are entered at each depot")
+
+    def append_tyre_events(self, rows):
+        raise PermissionError("The fleet view is read only, tyre events are entered at each depot")
+
+    def serial_history(self, tyre_serial):
+        '''Returns every tracking event of a tyre serial in date order, across all vehicles and depots'''
+        parts = self._map(lambda name, storage: normalize_depot_frame(storage.serial_history(tyre_serial), name))
+        return pd.concat(parts, ignore_index=True).sort_values('Date', kind='mergesort')
+
+    def fitments(self):
+        '''Returns the fitment index of the fleet-wide tracking events'''
+        events = self._frames()[1]
+        if self._fitments is None or self._fitment_generation != self._generation:
+            self._fitments = FitmentIndex()
+            self._fitments.apply(events)
+            self._fitment_generation = self._generation
+        return self._fitments
+
+    def movements(self, start=None, end=None):
+        '''Returns the fleet-wide inventory movement ledger (see inventory_movements) between two dates'''
+        return inventory_movements(self.read_receipts(start=start, end=end), self.read_tyre_events(start=start, end=end))
+
+    def valuation(self):
+        '''Returns the valuation of the fleet stock, valued as one pool across the depots'''
+        receipts, events = self._frames()
+        if self._valuation is None or self._valuation_generation != self._generation:
+            self._valuation = InventoryValuation()
+            self._valuation.apply(receipts, events)
+            self._valuation_generation = self._generation
+        return self._valuation
+
+    def rollup(self):
+        '''Returns the monthly rollup cube of the fleet, merged from the depots' own cubes'''
+        names = list(self.depots)
+        return RollupCube.combine(dict(zip(names, self._map(lambda name, storage: storage.rollup()))))
+
+    def update_inventory(self):
+        '''Returns the fleet-wide monthly inventory, it is not written back to any depot'''
+        return monthly_inventory(*self._frames())
+
+    def read_inventory(self):
+        return apply_schema(self.update_inventory().reset_index(), INV_SCHEMA).set_index('Time')
+
+    def depot_summary(self):
+        '''Returns a row per depot with its backend, receipt and tyre event counts, vehicles and last event date'''
+        receipts, events = self._frames()
+        rows = []
+        for name, storage in self.depots.items():
+            r = receipts[receipts[DEPOT_COLUMN] == name]
+            e = events[events[DEPOT_COLUMN] == name]
+            rows.append({DEPOT_COLUMN: name, 'Storage': storage.name, 'Receipts': len(r), 'Tyre_Events': len(e),
+                         'Vehicles': e['Vehicle_Number'].nunique(), 'Last_Event': e['Date'].max()})
+        return pd.DataFrame(rows)
+
+    def export_csv(self, table, path):
+        '''Exports a fleet-wide table ("receipts", "inventory" or "tyre_events") as csv file, with the depot of each record'''
+        if table == "receipts":
+            df = self.read_receipts()
+        elif table == "inventory":
+            df = self.read_inventory().reset_index()
+        else:
+            df = self.read_tyre_events()
+        df.to_csv(path, index=False)
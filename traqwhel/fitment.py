@@ -0,0 +1,311 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/fitment.py
+"""
+Tyre fitment engines: current fitments, serial index, value catalog and conflict checks
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import os
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .paths import TYRE_DB, INV_IN_DB, SERIAL_INDEX, CATALOG
+from .csvio import read_csv_since, recover_torn_tail
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_serial(value):
+    '''Returns the lookup key of a tyre serial, ignoring case and surrounding whitespace'''
+    return str(value).strip().upper()
+
+
+def normalize_serials(series):
+    '''Vectorized normalize_serial() over a Series, missing serials stay missing'''
+    return series.astype("string").str.strip().str.upper()
+
+
+class FitmentIndex():
+    '''
+    Materialized current fitment of every vehicle position:
+    (Vehicle_Number, Tyre_Location) -> latest Tyre_Serial, Date and Vehicle_Mileage.
+    Built with one sort and de-duplication over the tracking events and updated incrementally
+    with the events appended afterwards. Among events of the same date for a position the
+    last recorded one wins.
+    The fitted serials are also kept by normalized serial, for set-based conflict checks.
+    '''
+
+    def __init__(self):
+        self.rows = 0
+        self._fitted = {}
+        self._serials = {}
+        self._serials_frame = None
+
+    def apply(self, events):
+        '''Applies tracking events (DataFrame, in recorded order) to the index'''
+        self.rows += len(events)
+        df = events[['Vehicle_Number', 'Tyre_Location', 'Tyre_Serial', 'Date', 'Vehicle_Mileage']]
+        df = df.dropna(subset=['Vehicle_Number', 'Tyre_Location', 'Date'])
+        df = df.sort_values('Date', kind='mergesort').drop_duplicates(['Vehicle_Number', 'Tyre_Location'], keep='last')
+
+        for veh, loc, serial, date, mileage in df.itertuples(index=False, name=None):
+            positions = self._fitted.setdefault(str(veh), {})
+            current = positions.get(str(loc))
+            if current is None or date >= current['Date']:
+                positions[str(loc)] = {'Tyre_Serial': serial, 'Date': date, 'Vehicle_Mileage': mileage}
+                self._fit_serial(current and current['Tyre_Serial'], serial, (str(veh), str(loc)))
+        self._serials_frame = None
+
+    def _fit_serial(self, removed, fitted, position):
+        if not pd.isna(removed) and self._serials.get(normalize_serial(removed)) == position:
+            del self._serials[normalize_serial(removed)]
+        if not pd.isna(fitted) and normalize_serial(fitted):
+            self._serials[normalize_serial(fitted)] = position
+
+    def fitted_serials(self):
+        '''Returns the currently fitted serials as a DataFrame of Vehicle_Number and Tyre_Location
+        indexed by normalized serial'''
+        if self._serials_frame is None:
+            self._serials_frame = pd.DataFrame(list(self._serials.values()), index=list(self._serials.keys()),
+                                               columns=['Vehicle_Number', 'Tyre_Location'], dtype=object)
+        return self._serials_frame
+
+    def vehicle(self, vehicle_number):
+        '''Returns {Tyre_Location: {Tyre_Serial, Date, Vehicle_Mileage}} fitted on a vehicle'''
+        return self._fitted.get(vehicle_number, {})
+
+    def vehicle_summary(self, vehicle_number):
+        '''Returns (mileage, last modified date) of a vehicle, or (None, None) if unknown'''
+        positions = self.vehicle(vehicle_number)
+        if not positions:
+            return None, None
+        last_date = max(rec['Date'] for rec in positions.values())
+        mileage = max(rec['Vehicle_Mileage'] for rec in positions.values() if rec['Date'] == last_date)
+        return mileage, last_date
+
+    def vehicles(self):
+        return list(self._fitted.keys())
+
+
+class SerialIndex():
+    '''
+    Persistent hash index from normalized Tyre_Serial to the positions of its rows in the
+    tyre tracking database.
+
+    The index is kept in a json file with the high-water mark of the tracking database, so
+    maintaining it only reads the serials of the rows appended since the last update. The
+    postings of each update are appended as one json line to a log next to it
+    (<index file>.log), which is folded into the json file once it holds COMPACT_ENTRIES
+    updates, so an append does not rewrite the whole index.
+    A rewritten database triggers a full rebuild.
+    '''
+
+    COMPACT_ENTRIES = 200
+
+    def __init__(self, tyre_db=TYRE_DB, index_file=SERIAL_INDEX):
+        self.tyre_db = tyre_db
+        self.index_file = index_file
+        self.log_file = f"{index_file}.log"
+        self.state = None
+        self._log_entries = None
+
+    def load_state(self):
+        '''Returns the saved index with the logged updates replayed on top of it'''
+        try:
+            with open(self.index_file, 'r') as f:
+                state = json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+        self._log_entries = 0
+        try:
+            with open(self.log_file, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        entry = None
+                    if entry is None or entry.get('start') != state['rows']:
+                        # Torn or stale log, the next update compacts it away
+                        logger.info(f"Tyre serial index log ends after {self._log_entries} updates")
+                        self._log_entries = None
+                        break
+                    for key, positions in entry['serials'].items():
+                        state['serials'].setdefault(key, []).extend(positions)
+                    state['rows'] += entry['rows']
+                    state['mark'] = entry['mark']
+                    self._log_entries += 1
+        except IOError:
+            pass
+        return state
+
+    def save_state(self, state):
+        '''Writes the whole index and empties the log'''
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.index_file)
+        if os.path.isfile(self.log_file):
+            os.remove(self.log_file)
+        self._log_entries = 0
+
+    def append_log(self, entry):
+        '''Appends the postings of one update to the log'''
+        if os.path.isfile(self.log_file):
+            recover_torn_tail(self.log_file)
+        with open(self.log_file, 'a') as f:
+            f.write(json.dumps(entry) + "\n")
+        self._log_entries += 1
+
+    def update(self):
+        '''Indexes the rows appended to the tracking database since the last update'''
+        state = self.load_state() if self.state is None else self.state
+        df, mark, full = read_csv_since(self.tyre_db, state.get('mark'), usecols=['Tyre_Serial'], dtype={'Tyre_Serial': str})
+        if full:
+            logger.info("Rebuilding tyre serial index")
+            state = {'rows': 0, 'serials': {}}
+        elif not len(df):
+            self.state = state
+            return state['rows']
+
+        serials = state['serials']
+        keys = normalize_serials(df['Tyre_Serial']).fillna("")
+        positions = pd.Series(np.arange(state['rows'], state['rows'] + len(df)), index=df.index)
+        valid = keys != ""
+        postings = {}
+        for key, pos in positions[valid].groupby(keys[valid], sort=False):
+            postings[key] = pos.tolist()
+            serials.setdefault(key, []).extend(postings[key])
+
+        entry = {'start': state['rows'], 'rows': len(df), 'mark': mark, 'serials': postings}
+        state['rows'] += len(df)
+        state['mark'] = mark
+        if full or self._log_entries is None or self._log_entries >= self.COMPACT_ENTRIES:
+            self.save_state(state)
+        else:
+            self.append_log(entry)
+        self.state = state
+        return state['rows']
+
+    def positions(self, serial):
+        '''Returns the row positions of a serial in the tracking database'''
+        self.update()
+        return self.state['serials'].get(normalize_serial(serial), [])
+
+
+def find_fitment_conflicts(batch, fitments):
+    '''Flags the tyre events of a batch that conflict with each other or with the current fitments.
+    batch: DataFrame of new events with Tyre_Serial, Vehicle_Number and Tyre_Location
+    fitments: FitmentIndex of the recorded events
+    A serial conflicts when it is entered more than once in the batch, or when it is fitted on
+    another vehicle position that the batch does not refit.
+    Returns the conflicting rows of batch with a Conflict column describing each conflict.'''
+    keys = normalize_serials(batch['Tyre_Serial']).fillna("")
+    current = fitments.fitted_serials().reindex(keys.values)
+    current.index = batch.index
+
+    duplicated = (keys != "") & keys.duplicated(keep=False)
+
+    fitted = current['Vehicle_Number'].notna()
+    same_position = (current['Vehicle_Number'] == batch['Vehicle_Number']) & (current['Tyre_Location'] == batch['Tyre_Location'])
+    refitted = pd.MultiIndex.from_arrays([batch['Vehicle_Number'], batch['Tyre_Location']])
+    vacated = pd.MultiIndex.from_arrays([current['Vehicle_Number'], current['Tyre_Location']]).isin(refitted)
+    fitted_elsewhere = fitted & ~same_position & ~vacated
+
+    flagged = duplicated | fitted_elsewhere
+    fitted_on = "Fitted on " + current['Vehicle_Number'].astype(str) + " [" + current['Tyre_Location'].astype(str) + "]"
+    conflicts = batch[flagged].assign(Conflict=fitted_on.where(~duplicated, "Entered more than once")[flagged])
+    return conflicts
+
+
+class ValueCatalog():
+    '''
+    Persistent catalog of the distinct values seen in the databases (vehicles, tyre names,
+    employees and tyre locations), in order of first appearance.
+
+    Like SerialIndex it is kept in a json file with a high-water mark per source database and
+    only reads the rows appended since the last update. A rewritten database rebuilds its values.
+    '''
+
+    COLUMNS = {'tracking': ['Vehicle_Number', 'Tyre_Name', 'Employee_Name', 'Tyre_Location'],
+               'receipts': ['Tyre_Name']}
+
+    def __init__(self, tyre_db=TYRE_DB, inv_in_db=INV_IN_DB, catalog_file=CATALOG):
+        self.sources = {'tracking': tyre_db, 'receipts': inv_in_db}
+        self.catalog_file = catalog_file
+        self.state = None
+
+    def load_state(self):
+        try:
+            with open(self.catalog_file, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        tmp_file = f"{self.catalog_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.catalog_file)
+
+    def update(self):
+        '''Adds the values of the rows appended to the databases since the last update'''
+        state = self.load_state() if self.state is None else self.state
+        changed = False
+        for source, path in self.sources.items():
+            columns = self.COLUMNS[source]
+            entry = state.get(source, {})
+            df, mark, full = read_csv_since(path, entry.get('mark'), usecols=columns, dtype=str)
+            if full:
+                logger.info(f"Rebuilding value catalog for {os.path.basename(path)}")
+                entry = {'values': {col: [] for col in columns}}
+            elif not len(df):
+                continue
+
+            for col in columns:
+                known = entry['values'][col]
+                new = df[col].dropna().str.strip()
+                new = new[(new != "") & ~new.isin(known)].unique()
+                known.extend(new.tolist())
+            entry['mark'] = mark
+            state[source] = entry
+            changed = True
+
+        if changed:
+            self.save_state(state)
+        self.state = state
+
+    def _changed(self):
+        '''Whether a database moved on from its high-water mark (size or modification time)'''
+        for source, path in self.sources.items():
+            mark = self.state.get(source, {}).get('mark') if self.state is not None else None
+            try:
+                st = os.stat(path)
+            except OSError:
+                return True
+            if not mark or mark.get('offset') != st.st_size or mark.get('mtime') != st.st_mtime_ns:
+                return True
+        return False
+
+    def values(self, column):
+        '''Returns the distinct values of a column across the databases'''
+        if self._changed():
+            self.update()
+        return list(dict.fromkeys(value for source in self.sources for value in self.state[source]['values'].get(column, [])))
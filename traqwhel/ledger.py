@@ -0,0 +1,374 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/ledger.py
+"""
+Inventory engines: movement ledger, monthly inventory, rollup cube, valuation and forecasting
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import os
+import json
+import logging
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .paths import INV_DB, INV_IN_DB, TYRE_DB, INV_STATE
+from .csvio import read_csv_since
+
+logger = logging.getLogger(__name__)
+
+
+def inventory_movements(receipts, events):
+    '''Builds the inventory movement ledger: tyres received and fitted per day and tyre.
+    receipts: receipt DataFrame with Datetime, Tyre_Name and Quantity
+    events: tyre tracking DataFrame with Date and Tyre_Name, every event takes one tyre out
+    Returns a DataFrame of Date, Tyre_Name, Type ("IN" or "OUT"), Quantity and the signed Movement'''
+    received = pd.DataFrame({'Date': receipts['Datetime'].dt.floor(freq='D'), 'Tyre_Name': receipts['Tyre_Name'].astype(object),
+                             'Type': "IN", 'Quantity': receipts['Quantity'].astype(float)})
+    fitted = pd.DataFrame({'Date': events['Date'].dt.floor(freq='D'), 'Tyre_Name': events['Tyre_Name'].astype(object),
+                           'Type': "OUT", 'Quantity': 1.0})
+    df = pd.concat([received, fitted], ignore_index=True).dropna(subset=['Date', 'Tyre_Name'])
+    df = df.groupby(['Date', 'Tyre_Name', 'Type'], sort=True)['Quantity'].sum().reset_index()
+    df['Movement'] = df['Quantity'].where(df['Type'] == "IN", -df['Quantity'])
+    return df
+
+
+def cumulative_inventory(deltas, received):
+    '''Accumulates net monthly movements into the monthly inventory table
+    deltas: DataFrame of net quantity moved, indexed by month (YYYY-MM) with a column per tyre
+    received: tyre names that have receipts, which are the columns reported'''
+    pv = deltas.sort_index().reindex(columns=received, fill_value=0).fillna(0).cumsum()
+    if (pv % 1 == 0).all().all():
+        pv = pv.astype(int)
+    pv.index.name = "Time"
+    return pv
+
+
+def monthly_inventory(receipts, events):
+    '''Returns the monthly inventory of receipt and tracking frames, computed in memory without
+    the ledger files of MonthlyInventoryLedger'''
+    mv = inventory_movements(receipts, events)
+    deltas = mv.assign(Time=mv['Date'].dt.strftime("%Y-%m")).groupby(['Time', 'Tyre_Name'])['Movement'].sum().unstack(fill_value=0)
+    return cumulative_inventory(deltas, sorted(receipts['Tyre_Name'].dropna().unique())).rename_axis(columns=None)
+
+
+class MonthlyInventoryLedger():
+    '''
+    Maintains the monthly cumulative inventory (tyre_inventory_db.csv) from the receipt
+    ledger and the tyre tracking ledger incrementally.
+
+    The net quantity moved per month and tyre is kept in a state file together with a
+    high-water mark per source ledger, so an update only parses the rows appended since
+    the last update and re-accumulates the (few) monthly totals. A source that was
+    rewritten instead of appended to triggers a full rebuild.
+    '''
+
+    def __init__(self, inv_db=INV_DB, inv_in_db=INV_IN_DB, tyre_db=TYRE_DB, state_file=INV_STATE):
+        self.inv_db = inv_db
+        self.inv_in_db = inv_in_db
+        self.tyre_db = tyre_db
+        self.state_file = state_file
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def save_state(self, state):
+        tmp_file = f"{self.state_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_file, self.state_file)
+
+    def update(self, rebuild=False):
+        '''Brings tyre_inventory_db.csv up to date and returns it as a DataFrame indexed by Time'''
+        state = {} if rebuild else self.load_state()
+        marks = state.get('marks', {})
+
+        inv, inv_mark, inv_full = read_csv_since(self.inv_in_db, marks.get('receipts'), parse_dates=['Datetime'])
+        trk, trk_mark, trk_full = read_csv_since(self.tyre_db, marks.get('tracking'), parse_dates=['Date'])
+
+        if inv_full != trk_full:
+            # One source was rewritten, re-read the other so the rebuild starts from scratch
+            if not inv_full:
+                inv, inv_mark, inv_full = read_csv_since(self.inv_in_db, parse_dates=['Datetime'])
+            else:
+                trk, trk_mark, trk_full = read_csv_since(self.tyre_db, parse_dates=['Date'])
+
+        if inv_full:
+            logger.info("Rebuilding monthly inventory ledger")
+            state = {}
+
+        deltas = pd.DataFrame(state.get('deltas', {})).T
+        received = state.get('received', [])
+
+        changed = len(inv) or len(trk) or not os.path.isfile(self.inv_db)
+        if changed:
+            mv = inventory_movements(inv, trk)
+            new = mv.groupby([mv['Date'].dt.strftime("%Y-%m"), 'Tyre_Name'])['Movement'].sum().unstack(fill_value=0)
+            deltas = deltas.add(new, fill_value=0).fillna(0).sort_index()
+            received = sorted(set(received).union(inv['Tyre_Name'].dropna().unique()))
+            logger.info(f"Inventory ledger updated with {len(inv)} receipt rows and {len(trk)} tracking rows over {len(new)} month(s)")
+
+        pv = cumulative_inventory(deltas, received)
+
+        if changed:
+            pv.to_csv(self.inv_db)
+            self.save_state({'marks': {'receipts': inv_mark, 'tracking': trk_mark},
+                             'deltas': deltas.T.to_dict(),
+                             'received': received})
+
+        return pv
+
+
+def consumption_forecast(monthly, stock, window=6, lead_time=1.0, z=1.65, until=None):
+    '''Forecasts tyre consumption and reorder points from the monthly consumption history.
+    monthly: DataFrame of tyres fitted per month, indexed by month (YYYY-MM) with a column per tyre
+    stock: Series of the current stock per tyre
+    window: months in the rolling demand window
+    lead_time: months between placing and receiving an order
+    z: safety factor for the service level (1.65 for 95%)
+    until: month the history runs up to at least, defaults to the current month so idle months count as zero
+    Returns (history, plan): history holds the monthly consumption with its rolling mean per tyre
+    (columns Tyre_Name, Month, Fitted, Rolling_Mean), plan a row per tyre with Stock, Monthly_Rate,
+    Monthly_Std, Safety_Stock, Reorder_Point, Months_Of_Cover, Reorder and Suggested_Order.'''
+    until = pd.Timestamp(until or datetime.now()).strftime("%Y-%m")
+    months = pd.period_range(min(monthly.index.min(), until), max(monthly.index.max(), until), freq='M').strftime("%Y-%m")
+    monthly = monthly.reindex(months, fill_value=0).astype(float)
+    monthly = monthly.reindex(columns=monthly.columns.union(stock.index), fill_value=0)
+
+    rolling = monthly.rolling(window, min_periods=1)
+    mean = rolling.mean()
+    std = rolling.std().fillna(0)
+
+    plan = pd.DataFrame({'Stock': stock.reindex(monthly.columns).fillna(0), 'Monthly_Rate': mean.iloc[-1], 'Monthly_Std': std.iloc[-1]})
+    plan['Safety_Stock'] = z * plan['Monthly_Std'] * np.sqrt(lead_time)
+    plan['Reorder_Point'] = plan['Monthly_Rate'] * lead_time + plan['Safety_Stock']
+    plan['Months_Of_Cover'] = plan['Stock'] / plan['Monthly_Rate'].replace(0, np.nan)
+    plan['Reorder'] = plan['Stock'] <= plan['Reorder_Point']
+    plan['Suggested_Order'] = np.ceil((plan['Reorder_Point'] + plan['Monthly_Rate'] * lead_time - plan['Stock']).clip(lower=0))
+    plan.index.name = 'Tyre_Name'
+
+    history = pd.DataFrame({'Tyre_Name': np.tile(monthly.columns, len(monthly)), 'Month': np.repeat(monthly.index, len(monthly.columns)),
+                            'Fitted': monthly.values.ravel(), 'Rolling_Mean': mean.values.ravel()})
+    return history, plan
+
+
+class RollupCube():
+    '''
+    Monthly rollup of the databases: event counts, tyre quantities and costs keyed by
+    (Month, Tyre_Name, Vehicle_Number, Tyre_Location, Activity).
+
+    Receipts are rolled up with Activity "Receipt" and no vehicle or location, tracking events
+    count one tyre each and have no cost. The cells of each source are kept apart with the
+    source mark, so an update only rolls up the rows appended since and merges them in.
+    '''
+
+    KEYS = ['Month', 'Tyre_Name', 'Vehicle_Number', 'Tyre_Location', 'Activity']
+    MEASURES = ['Events', 'Quantity', 'Cost']
+    SOURCES = ['receipts', 'tracking']
+
+    def __init__(self, state=None):
+        self.marks = {}
+        self._cells = {}
+        self._frame = None
+        for source, entry in (state or {}).items():
+            self.marks[source] = entry['mark']
+            self._cells[source] = pd.DataFrame(entry['cells'], columns=self.KEYS + self.MEASURES)
+
+    @classmethod
+    def rollup(cls, source, df):
+        '''Rolls up raw receipt or tracking rows into cube cells'''
+        if source == "receipts":
+            cells = pd.DataFrame({'Month': df['Datetime'].dt.strftime("%Y-%m"), 'Tyre_Name': df['Tyre_Name'].astype(object),
+                                  'Vehicle_Number': "", 'Tyre_Location': "", 'Activity': "Receipt", 'Events': 1,
+                                  'Quantity': df['Quantity'].astype(float), 'Cost': df['Total_Cost'].astype(float)})
+        else:
+            cells = pd.DataFrame({'Month': df['Date'].dt.strftime("%Y-%m"), 'Tyre_Name': df['Tyre_Name'].astype(object),
+                                  'Vehicle_Number': df['Vehicle_Number'].astype(object), 'Tyre_Location': df['Tyre_Location'].astype(object),
+                                  'Activity': df['Activity'].astype(object), 'Events': 1, 'Quantity': 1.0, 'Cost': 0.0})
+        cells[cls.KEYS] = cells[cls.KEYS].fillna("")
+        return cells.groupby(cls.KEYS, sort=False)[cls.MEASURES].sum().reset_index()
+
+    def apply(self, source, df, mark, full=False):
+        '''Merges the rows appended to a source (or all rows if full) into the cube'''
+        self.marks[source] = mark
+        if not len(df) and not full:
+            return
+        cells = self.rollup(source, df)
+        if not full and source in self._cells:
+            cells = pd.concat([self._cells[source], cells]).groupby(self.KEYS, sort=False)[self.MEASURES].sum().reset_index()
+        self._cells[source] = cells
+        self._frame = None
+
+    def state(self):
+        return {source: {'mark': self.marks.get(source), 'cells': cells.values.tolist()} for source, cells in self._cells.items()}
+
+    @classmethod
+    def combine(cls, cubes):
+        '''Merges named cubes (one per depot) into a new cube. The mark of each source becomes the
+        dict of the marks of the named cubes, so it still changes whenever one of them does'''
+        cube = cls()
+        for source in cls.SOURCES:
+            parts = [c._cells[source] for c in cubes.values() if source in c._cells]
+            if parts:
+                cube._cells[source] = pd.concat(parts).groupby(cls.KEYS, sort=False)[cls.MEASURES].sum().reset_index()
+            cube.marks[source] = {name: c.marks.get(source) for name, c in cubes.items()}
+        return cube
+
+    def cells(self, source=None):
+        '''Returns the cells of one source, or of all sources'''
+        if source is not None:
+            return self._cells.get(source, pd.DataFrame(columns=self.KEYS + self.MEASURES))
+        if self._frame is None:
+            self._frame = pd.concat([self.cells(s) for s in self.SOURCES], ignore_index=True)
+        return self._frame
+
+    def query(self, by=('Month',), measures=None, source=None, start=None, end=None, **equals):
+        '''Sums measures over the cells grouped by the keys in by.
+        source: "receipts", "tracking" or None for both
+        start, end: inclusive month range, as "YYYY-MM" or a date
+        equals: key=value (or list of values) filters, None values are ignored'''
+        df = self.cells(source)
+        if start is not None:
+            df = df[df['Month'] >= pd.Timestamp(start).strftime("%Y-%m")]
+        if end is not None:
+            df = df[df['Month'] <= pd.Timestamp(end).strftime("%Y-%m")]
+        for col, value in equals.items():
+            if value is None:
+                continue
+            df = df[df[col].isin(value if isinstance(value, (list, tuple, set)) else [value])]
+        return df.groupby(list(by))[measures or self.MEASURES].sum()
+
+
+def _moving_average(a, b, x0):
+    '''Solves x[i] = a[i] * x[i-1] + b[i], x[-1] = x0, one receipt at a time.
+    A receipt where a is 0 starts afresh, so a missing x0 is not carried over.'''
+    x = np.empty(len(a))
+    prev = x0
+    for i in range(len(a)):
+        prev = b[i] if a[i] == 0 else a[i] * prev + b[i]
+        x[i] = prev
+    return x
+
+
+class InventoryValuation():
+    '''
+    Values tyre stock and consumption with FIFO and moving-average costing.
+
+    Per tyre the cumulative received quantity and cost of the receipts are kept as arrays,
+    the FIFO cost of the first k tyres fitted is read off them by interpolation. The
+    moving-average unit cost is updated receipt by receipt. Movements are ordered by day, receipts before fitments of the
+    same day. New rows are valued on top of the kept state; rows dated before the last
+    valued movement are refused so the caller can rebuild.
+    '''
+
+    def __init__(self):
+        self.rows = {'receipts': 0, 'tracking': 0}
+        self.last_key = None
+        self._tyres = {}
+        self._monthly = pd.DataFrame({'Month': pd.Series(dtype=object), 'Tyre_Name': pd.Series(dtype=object),
+                                      'FIFO_Cost': pd.Series(dtype=float), 'Average_Cost': pd.Series(dtype=float)})
+
+    def apply(self, receipts, events):
+        '''Values the receipts and tracking events appended since the last apply.
+        Returns False, leaving the valuation unchanged, when they predate the valued movements'''
+        mv = pd.concat([pd.DataFrame({'Day': receipts['Datetime'].dt.floor(freq='D'), 'Kind': 0,
+                                      'Tyre_Name': receipts['Tyre_Name'].astype(object),
+                                      'Quantity': receipts['Quantity'].astype(float), 'Cost': receipts['Total_Cost'].astype(float)}),
+                        pd.DataFrame({'Day': events['Date'].dt.floor(freq='D'), 'Kind': 1,
+                                      'Tyre_Name': events['Tyre_Name'].astype(object), 'Quantity': 1.0, 'Cost': 0.0})],
+                       ignore_index=True).dropna(subset=['Day', 'Tyre_Name'])
+        mv = mv.sort_values(['Day', 'Kind'], kind='mergesort')
+
+        if len(mv):
+            first_key = (mv['Day'].iloc[0], mv['Kind'].iloc[0])
+            if self.last_key is not None and first_key < self.last_key:
+                return False
+            self.last_key = (mv['Day'].iloc[-1], mv['Kind'].iloc[-1])
+
+        consumed = []
+        for tyre, grp in mv.groupby('Tyre_Name', sort=False):
+            state = self._tyres.setdefault(tyre, {'cum_qty': np.zeros(1), 'cum_cost': np.zeros(1), 'consumed': 0.0,
+                                                  'stock': 0.0, 'avg_cost': np.nan})
+            fifo, average = self._value(state, grp['Kind'].values == 0, grp['Quantity'].values, grp['Cost'].values)
+            fitted = grp[grp['Kind'] == 1]
+            consumed.append(pd.DataFrame({'Month': fitted['Day'].dt.strftime("%Y-%m"), 'Tyre_Name': tyre,
+                                          'FIFO_Cost': fifo, 'Average_Cost': average}))
+
+        if consumed:
+            self._monthly = pd.concat([self._monthly] + consumed, ignore_index=True).groupby(
+                ['Month', 'Tyre_Name'], as_index=False)[['FIFO_Cost', 'Average_Cost']].sum()
+        self.rows['receipts'] += len(receipts)
+        self.rows['tracking'] += len(events)
+        return True
+
+    @staticmethod
+    def _fifo_cost(state, consumed):
+        '''FIFO cost of the first consumed tyres, tyres beyond the receipts cost the last unit cost'''
+        cum_qty, cum_cost = state['cum_qty'], state['cum_cost']
+        if len(cum_qty) < 2:
+            return np.full(len(consumed), np.nan)
+        last_unit = (cum_cost[-1] - cum_cost[-2]) / (cum_qty[-1] - cum_qty[-2]) if cum_qty[-1] > cum_qty[-2] else 0.0
+        return np.interp(consumed, cum_qty, cum_cost) + np.clip(consumed - cum_qty[-1], 0, None) * last_unit
+
+    def _value(self, state, received, qty, cost):
+        '''Values the chronological movements of one tyre, returns the (FIFO, moving-average)
+        cost of each fitment'''
+        state['cum_qty'] = np.concatenate([state['cum_qty'], state['cum_qty'][-1] + np.cumsum(qty[received])])
+        state['cum_cost'] = np.concatenate([state['cum_cost'], state['cum_cost'][-1] + np.cumsum(cost[received])])
+
+        consumed = state['consumed'] + np.cumsum(qty[~received])
+        fifo = np.diff(self._fifo_cost(state, np.concatenate([[state['consumed']], consumed])))
+        if len(consumed):
+            state['consumed'] = consumed[-1]
+
+        signed = np.where(received, qty, -qty)
+        stock_after = state['stock'] + np.cumsum(signed)
+        stock_before = np.clip(stock_after - signed, 0, None)[received]
+        total = stock_before + qty[received]
+        a = np.divide(stock_before, total, out=np.ones(len(total)), where=total > 0)
+        b = np.divide(cost[received], total, out=np.zeros(len(total)), where=total > 0)
+        avg_after = _moving_average(a, b, state['avg_cost'])
+
+        last_receipt = np.cumsum(received) - 1
+        avg_at = np.where(last_receipt >= 0, avg_after[np.maximum(last_receipt, 0)] if len(avg_after) else np.nan, state['avg_cost'])
+        if len(stock_after):
+            state['stock'] = stock_after[-1]
+        if len(avg_after):
+            state['avg_cost'] = avg_after[-1]
+        return fifo, avg_at[~received] * qty[~received]
+
+    def stock_values(self):
+        '''Returns the stock of every received tyre with its FIFO value, moving-average unit cost and value'''
+        dlist = []
+        for tyre, state in self._tyres.items():
+            if len(state['cum_qty']) < 2:
+                continue
+            stock = max(state['stock'], 0)
+            fifo_value = state['cum_cost'][-1] - self._fifo_cost(state, np.array([state['consumed']]))[0]
+            dlist.append({'Tyre_Name': tyre, 'Stock': stock, 'FIFO_Value': max(fifo_value, 0) if stock else 0.0,
+                          'Average_Unit_Cost': state['avg_cost'], 'Average_Value': stock * state['avg_cost']})
+        return pd.DataFrame(dlist, columns=['Tyre_Name', 'Stock', 'FIFO_Value', 'Average_Unit_Cost', 'Average_Value']).set_index('Tyre_Name')
+
+    def monthly_consumption(self, tyre_name=None):
+        '''Returns the FIFO and moving-average cost of the tyres fitted per month'''
+        df = self._monthly if tyre_name is None else self._monthly[self._monthly['Tyre_Name'] == tyre_name]
+        return df.groupby('Month')[['FIFO_Cost', 'Average_Cost']].sum()
@@ -0,0 +1,71 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/mileage.py
+"""
+Mileage analytics: fleet replacement intervals and per-fitment tyre lifecycles
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import pandas as pd
+
+
+def fleet_mileage(events):
+    '''Computes the mileage between tyre replacement dates of every vehicle in one pass.
+    events: tyre tracking DataFrame with Vehicle_Number, Date and Vehicle_Mileage
+    The mileage of a vehicle on a replacement date is the mean mileage recorded that day.
+    Returns a DataFrame with a row per vehicle (in order of first appearance): Vehicle_Number,
+    Replacements (dates), Average_Mileage, Min_Mileage and Max_Mileage (between replacements),
+    Last_Date and Last_Mileage.'''
+    df = events[['Vehicle_Number', 'Date', 'Vehicle_Mileage']].dropna(subset=['Vehicle_Number', 'Date'])
+    daily = df.groupby(['Vehicle_Number', 'Date'], observed=True, sort=True)['Vehicle_Mileage'].mean().reset_index()
+    daily['Interval'] = daily.groupby('Vehicle_Number', observed=True)['Vehicle_Mileage'].diff()
+
+    summary = daily.groupby('Vehicle_Number', observed=True).agg(Replacements=('Date', 'size'),
+                                                                 Average_Mileage=('Interval', 'mean'),
+                                                                 Min_Mileage=('Interval', 'min'),
+                                                                 Max_Mileage=('Interval', 'max'),
+                                                                 Last_Date=('Date', 'last'),
+                                                                 Last_Mileage=('Vehicle_Mileage', 'last'))
+    summary = summary.reindex(pd.unique(df['Vehicle_Number']))
+    summary.index.name = 'Vehicle_Number'
+    return summary.reset_index()
+
+
+def tyre_lifecycles(events):
+    '''Pairs every tyre fitment with the next replacement at the same vehicle position.
+    events: tyre tracking DataFrame
+    Of several events recorded for a position on the same date, the last recorded one counts.
+    The removal reason is the reason recorded on the replacing event.
+    Returns a DataFrame with a row per fitment: Tyre_Serial, Tyre_Name, Vehicle_Number,
+    Tyre_Location, Fitted_Date, Fitted_Mileage, Removed_Date, Removed_Mileage, Distance,
+    Days_In_Service and Removal_Reason. Tyres still fitted have no removal values.'''
+    keys = ['Vehicle_Number', 'Tyre_Location']
+    df = events.dropna(subset=keys + ['Date'])
+    df = df.sort_values(keys + ['Date'], kind='mergesort').drop_duplicates(keys + ['Date'], keep='last')
+
+    following = df.groupby(keys, observed=True)[['Date', 'Vehicle_Mileage', 'Reason']].shift(-1)
+    cycles = pd.DataFrame({'Tyre_Serial': df['Tyre_Serial'],
+                           'Tyre_Name': df['Tyre_Name'],
+                           'Vehicle_Number': df['Vehicle_Number'],
+                           'Tyre_Location': df['Tyre_Location'],
+                           'Fitted_Date': df['Date'],
+                           'Fitted_Mileage': df['Vehicle_Mileage'],
+                           'Removed_Date': following['Date'],
+                           'Removed_Mileage': following['Vehicle_Mileage'],
+                           'Distance': following['Vehicle_Mileage'] - df['Vehicle_Mileage'],
+                           'Days_In_Service': (following['Date'] - df['Date']).dt.days,
+                           'Removal_Reason': following['Reason']})
+    return cycles.reset_index(drop=True)
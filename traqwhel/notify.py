@@ -0,0 +1,70 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/notify.py
+"""
+Change notifications: views subscribe to the data sets they show and refresh when those change
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# ----- Methods ----- #
+
+# Data sets
+RECEIPTS = "receipts"
+TRACKING = "tracking"
+PROFILES = "profiles"
+DATA = (RECEIPTS, TRACKING)
+
+
+class ChangeNotifier():
+    '''
+    Registry of the callbacks subscribed to each data set.
+
+    notify() calls every subscriber of the changed data sets once, with the set of the changed
+    data sets it subscribed to, so a view showing both receipts and tracking events refreshes
+    once when both change. A failing callback is logged and does not stop the others.
+    '''
+
+    def __init__(self):
+        self._subscribers = {}
+
+    def subscribe(self, callback, *topics):
+        '''Subscribes callback(changed topics) to the data sets'''
+        for topic in topics:
+            callbacks = self._subscribers.setdefault(topic, [])
+            if callback not in callbacks:
+                callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        for callbacks in self._subscribers.values():
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def notify(self, *topics):
+        '''Calls the subscribers of the changed data sets'''
+        calls = {}
+        for topic in topics:
+            for callback in self._subscribers.get(topic, []):
+                calls.setdefault(callback, set()).add(topic)
+        logger.info(f"Data changed - {', '.join(topics)}, notifying {len(calls)} view(s)")
+        for callback, changed in calls.items():
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.exception(f"Error refreshing {getattr(callback, '__qualname__', callback)} - {e}")
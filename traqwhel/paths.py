@@ -0,0 +1,55 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/paths.py
+"""
+Default locations of the data and configuration files, relative to the working directory
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import os
+
+
+DATA_SOURCE = os.path.join(os.getcwd(), "data")
+CONFIG_SOURCE = os.path.join(os.getcwd(), "config")
+
+CONFIG_FILE = os.path.join(CONFIG_SOURCE, "systemconfig.xml")
+
+INV_FILE_NAME = "tyre_inventory_db.csv"
+INV_DB = os.path.join(DATA_SOURCE, INV_FILE_NAME)
+
+INV_IN_FILE_NAME = "tyre_inventory_in_db.csv"
+INV_IN_DB = os.path.join(DATA_SOURCE, INV_IN_FILE_NAME)
+
+TYRE_FILE_NAME = "tyre_tracking_db.csv"
+TYRE_DB = os.path.join(DATA_SOURCE, TYRE_FILE_NAME)
+
+INV_STATE_FILE_NAME = "tyre_inventory_state.json"
+INV_STATE = os.path.join(DATA_SOURCE, INV_STATE_FILE_NAME)
+
+SERIAL_INDEX_FILE_NAME = "tyre_serial_index.json"
+SERIAL_INDEX = os.path.join(DATA_SOURCE, SERIAL_INDEX_FILE_NAME)
+
+CATALOG_FILE_NAME = "tyre_catalog.json"
+CATALOG = os.path.join(DATA_SOURCE, CATALOG_FILE_NAME)
+
+ROLLUP_FILE_NAME = "tyre_rollup.json"
+ROLLUP = os.path.join(DATA_SOURCE, ROLLUP_FILE_NAME)
+
+SQLITE_FILE_NAME = "tint.db"
+SQLITE_DB = os.path.join(DATA_SOURCE, SQLITE_FILE_NAME)
+
+# Snapshots and indexes of data directories the app only reads (fleet view depots)
+CACHE_SOURCE = os.path.join(os.getcwd(), "cache")
@@ -0,0 +1,136 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/profiles.py
+"""
+In-memory registry of the configuration profiles in systemconfig.xml
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import os
+import copy
+import logging
+
+from xml.etree import ElementTree as ET
+from xml.dom import minidom
+
+from .paths import CONFIG_FILE
+from .notify import PROFILES
+
+logger = logging.getLogger(__name__)
+
+
+class ProfileRegistry():
+    '''
+    In-memory registry of the configuration profiles in systemconfig.xml.
+
+    The file is parsed once and kept with a list of values per (profile, key) and an index
+    of each profile by its identifying key (truck number, tyre name, employee name).
+    The registry reloads when it is written through write(), invalidated, or when the file
+    changed on disk. Writes are published as PROFILES changes through the notifier, if given.
+    '''
+
+    INDEX_KEYS = {"Vehicle": "Truck_num", "Tyre": "Tyre_name", "Employee": "Emp_name"}
+
+    def __init__(self, config_file=CONFIG_FILE, notifier=None):
+        self.config_file = config_file
+        self.notifier = notifier
+        self._stat = None
+        self._root = None
+        self._values = {}
+        self._index = {}
+        self._counts = {}
+
+    def load(self):
+        st = os.stat(self.config_file)
+        self._root = ET.parse(self.config_file).getroot()
+        self._stat = (st.st_size, st.st_mtime_ns)
+        self._values = {}
+        self._index = {}
+        self._counts = {}
+        for node in self._root:
+            suffix = "Settings" if node.tag == "App" else "Profile"
+            self._counts[node.tag] = len(node.findall(f"{node.tag}{suffix}"))
+            for el in node.findall(f"{node.tag}{suffix}"):
+                for key, value in el.attrib.items():
+                    self._values.setdefault((node.tag, key), []).append(value)
+                if node.tag in self.INDEX_KEYS:
+                    self._index.setdefault(node.tag, {})[el.attrib.get(self.INDEX_KEYS[node.tag])] = dict(el.attrib)
+        logger.info(f"Profile registry loaded from {self.config_file}")
+
+    @property
+    def root(self):
+        '''The parsed configuration root element, treat as read-only'''
+        return self._current()
+
+    def _current(self):
+        try:
+            st = os.stat(self.config_file)
+            stat = (st.st_size, st.st_mtime_ns)
+        except OSError:
+            stat = None
+        if self._root is None or stat != self._stat:
+            self.load()
+        return self._root
+
+    def editable_root(self):
+        '''Returns a copy of the configuration root to modify and pass to write()'''
+        return copy.deepcopy(self.root)
+
+    def write(self, root):
+        '''Writes the configuration root to systemconfig.xml and reloads the registry'''
+        dom = minidom.parseString(ET.tostring(root, encoding='utf8', method='xml'))
+        with open(self.config_file, 'w') as fw:
+            fw.writelines(line + "\n" for line in dom.toprettyxml(indent="\t").split("\n") if not line.strip() == "")
+        self.invalidate()
+        if self.notifier is not None:
+            self.notifier.notify(PROFILES)
+
+    def invalidate(self):
+        self._root = None
+
+    def profiles(self):
+        '''Returns the profile names (Vehicle, Tyre, Employee) in file order'''
+        return [node.tag for node in self.root if node.tag != "App"]
+
+    def count(self, profile):
+        '''Returns the number of entries in the profile'''
+        self._current()
+        return self._counts.get(profile, 0)
+
+    def values(self, profile, key):
+        '''Returns the list of values of key in the profile'''
+        self._current()
+        return list(self._values.get((profile, key), []))
+
+    def lookup(self, profile, value):
+        '''Returns the attributes of the profile entry identified by value, or None'''
+        self._current()
+        return self._index.get(profile, {}).get(value)
+
+    def depots(self):
+        '''Returns {depot name: data directory} of the depots added to the fleet view, stored as
+        App settings with Depot and Depot_dir attributes'''
+        return {el.attrib['Depot']: el.attrib['Depot_dir'] for el in self.root.findall("App/AppSettings")
+                if 'Depot' in el.attrib and 'Depot_dir' in el.attrib}
+
+    def vehicle(self, truck_num):
+        return self.lookup("Vehicle", truck_num)
+
+    def tyre(self, tyre_name):
+        return self.lookup("Tyre", tyre_name)
+
+    def employee(self, emp_name):
+        return self.lookup("Employee", emp_name)
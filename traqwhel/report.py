@@ -0,0 +1,206 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/report.py
+"""
+Batch report generator: renders every dashboard chart to image files without the GUI
+
+    python -m traqwhel.report --data data --out reports --format png pdf
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from .paths import DATA_SOURCE
+from .storage import open_storage
+from .depots import FleetStorage
+from .ledger import monthly_inventory, consumption_forecast
+from .mileage import fleet_mileage, tyre_lifecycles
+from .charts import (FONT_SIZE, draw_inventory_trend, draw_tyre_usage, draw_monthly_usage, draw_forecast,
+                     draw_vehicle_mileage, draw_tyre_mileage)
+
+logger = logging.getLogger(__name__)
+
+# ----- Methods ----- #
+
+REPORT_SOURCE = os.path.join(os.getcwd(), "reports")
+VEHICLE_DIR_NAME = "tyre_mileage"
+CACHE_DIR_NAME = ".cache"
+FORMATS = ("png", "pdf")
+NO_DATA = "no data"
+
+
+def chart_file_name(name):
+    '''Returns name with every character that is not safe in a file name replaced by an underscore'''
+    return re.sub(r"[^\w.-]+", "_", str(name).strip()) or "_"
+
+
+def render_chart(job):
+    '''Draws one chart into a new Agg figure and saves it once per format.
+    job: (path without extension, draw function, number of stacked axes, draw arguments, formats, dpi)
+    Returns (path, list of files written, error message or None)'''
+    path, draw, nrows, args, formats, dpi = job
+    try:
+        matplotlib.rcParams.update({'font.size': FONT_SIZE})
+        fig = Figure(figsize=(11.69, 8.27))
+        FigureCanvasAgg(fig)
+        axes = fig.subplots(nrows, 1, squeeze=False)[:, 0]
+        draw(*axes, *args)
+        # Lay out once here rather than on every savefig
+        fig.tight_layout()
+        files = []
+        for fmt in formats:
+            fig.savefig(f"{path}.{fmt}", format=fmt, dpi=dpi)
+            files.append(f"{path}.{fmt}")
+        return path, files, None
+    except Exception as e:
+        return path, [], f"{type(e).__name__}: {e}"
+
+
+def fleet_jobs(storage, out_dir, window):
+    '''Returns (render jobs of the fleet wide dashboard charts less formats and dpi, paths of the charts
+    without data to draw, tracking events). The monthly inventory is computed in memory, the storage
+    ledger files are not updated'''
+    receipts = storage.read_receipts()
+    events = storage.read_tyre_events()
+    inventory = monthly_inventory(receipts, events)
+    movements = storage.movements()
+    cube = storage.rollup()
+    monthly = cube.query(by=['Month', 'Tyre_Name'], measures=['Quantity'], source="tracking")['Quantity'].unstack(fill_value=0)
+    fleet = fleet_mileage(events)
+
+    charts = [
+        ("inventory_trend", draw_inventory_trend, 1, (inventory, datetime.now().replace(microsecond=0)) if inventory.size else None),
+        ("tyre_usage", draw_tyre_usage, 2, (movements,) if len(movements) else None),
+        ("monthly_usage", draw_monthly_usage, 2, (cube,) if len(receipts) or len(events) else None),
+        ("tyre_forecast", draw_forecast, 2,
+         (*consumption_forecast(monthly, inventory.sort_index().iloc[-1], window=window), window) if monthly.size and inventory.size else None),
+        ("vehicle_mileage", draw_vehicle_mileage, 1, (fleet,) if len(fleet) else None),
+    ]
+
+    jobs, empty = [], []
+    for name, draw, nrows, args in charts:
+        if args is None:
+            empty.append(os.path.join(out_dir, name))
+        else:
+            jobs.append((os.path.join(out_dir, name), draw, nrows, args))
+    return jobs, empty, events
+
+
+def vehicle_jobs(events, out_dir):
+    '''Returns a tyre mileage render job per vehicle with at least one completed fitment, less formats and dpi.
+    The lifecycles are computed once for the fleet and split by vehicle, so only the rows a chart needs are sent to a worker'''
+    df = tyre_lifecycles(events).dropna(subset=['Distance'])
+    jobs = []
+    for vehicle_number, grp in df.groupby('Vehicle_Number', sort=True, observed=True):
+        jobs.append((os.path.join(out_dir, chart_file_name(vehicle_number)), draw_tyre_mileage, 1,
+                     (grp[['Tyre_Location', 'Distance']].reset_index(drop=True), vehicle_number)))
+    return jobs
+
+
+def generate_report(data_source=DATA_SOURCE, out_dir=REPORT_SOURCE, formats=("png",), dpi=100, window=6, workers=None, depots=None,
+                    cache_dir=None):
+    '''Renders the fleet charts and a tyre mileage chart per vehicle of the data directory, or of all
+    depots ({depot name: data directory}) when given, into out_dir.
+    Charts are rendered over a pool of worker processes, or in this process when workers is 1.
+    The data directories are only read, snapshots and indexes go to cache_dir (default out_dir/.cache).
+    Returns (list of files written, list of (chart path, error message)), charts without data have
+    the NO_DATA error message'''
+    vehicle_dir = os.path.join(out_dir, VEHICLE_DIR_NAME)
+    os.makedirs(vehicle_dir, exist_ok=True)
+    cache_dir = cache_dir or os.path.join(out_dir, CACHE_DIR_NAME)
+
+    storage = FleetStorage(depots, cache_dir=cache_dir) if depots else open_storage(data_source, cache_dir=cache_dir)
+    jobs, empty, events = fleet_jobs(storage, out_dir, window)
+    jobs += vehicle_jobs(events, vehicle_dir)
+    jobs = [job + (tuple(formats), dpi) for job in jobs]
+    logger.info(f"Rendering {len(jobs)} charts from [{', '.join(depots.values()) if depots else data_source}] into [{out_dir}]")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = list(map(render_chart, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render_chart, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+    files, errors = [], []
+    for path in empty:
+        logger.info(f"No data for {path}")
+        errors.append((path, NO_DATA))
+    for path, written, error in results:
+        files += written
+        if error:
+            logger.error(f"Error rendering {path} - {error}")
+            errors.append((path, error))
+    return files, errors
+
+
+def main(argv=None):
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(prog="python -m traqwhel.report",
+                                     description="Render every TraqWhel dashboard chart, with a tyre mileage chart per vehicle, to image files.")
+    parser.add_argument("--data", default=DATA_SOURCE, help="data directory to report on (default: %(default)s)")
+    parser.add_argument("--depot", action="append", metavar="NAME=DIR", default=[],
+                        help="report on several depots together, repeat for each depot (replaces --data)")
+    parser.add_argument("--out", default=REPORT_SOURCE, help="output directory (default: %(default)s)")
+    parser.add_argument("--cache", default=None, help=f"directory for snapshots and indexes of the data (default: OUT/{CACHE_DIR_NAME})")
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["png"], help="output formats (default: png)")
+    parser.add_argument("--dpi", type=int, default=100, help="resolution of png charts (default: %(default)s)")
+    parser.add_argument("--window", type=int, default=6, help="rolling window of the tyre forecast in months (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, 1 renders in this process (default: CPU count)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    depots = {}
+    for depot in args.depot:
+        name, sep, data_source = depot.partition("=")
+        if not sep or not name or not os.path.isdir(data_source):
+            parser.error(f"invalid depot, expected NAME=DIR with an existing directory - {depot}")
+        depots[name] = data_source
+    if not depots and not os.path.isdir(args.data):
+        parser.error(f"data directory not found - {args.data}")
+
+    start = time.perf_counter()
+    files, errors = generate_report(args.data, args.out, formats=args.format, dpi=args.dpi, window=args.window, workers=args.workers,
+                                    depots=depots, cache_dir=args.cache)
+    print(f"Wrote {len(files)} files to {args.out} in {time.perf_counter() - start:.1f}s")
+    failed = False
+    for path, error in errors:
+        if error == NO_DATA:
+            print(f"No data for {path}", file=sys.stderr)
+        else:
+            print(f"Failed {path}: {error}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
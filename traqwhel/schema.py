@@ -0,0 +1,175 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/schema.py
+"""
+Columns and dtypes of the databases, date parsing and typed DataFrame helpers
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import logging
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+INV_IN_COLUMNS = ['Datetime', 'Tyre_Name', 'Quantity', 'Cost/Unit', 'Total_Cost']
+TYRE_COLUMNS = ['Date', 'Activity', 'Reason', 'Employee_Name', 'Tyre_Name', 'Tyre_Serial', 'Vehicle_Number', 'Vehicle_Type', 'Vehicle_Mileage', 'Tyre_Location', 'Tyre_Size']
+
+# Column dtypes applied when loading the databases, '*' applies to undeclared columns
+INV_SCHEMA = {'Time': 'object', '*': 'int32'}
+INV_IN_SCHEMA = {'Datetime': 'datetime64[ns]', 'Tyre_Name': 'category', 'Quantity': 'int32', 'Cost/Unit': 'float32', 'Total_Cost': 'float32'}
+TYRE_SCHEMA = {'Date': 'datetime64[ns]', 'Activity': 'category', 'Reason': 'category', 'Employee_Name': 'category', 'Tyre_Name': 'category', 'Tyre_Serial': 'object',
+               'Vehicle_Number': 'category', 'Vehicle_Type': 'category', 'Vehicle_Mileage': 'int32', 'Tyre_Location': 'category', 'Tyre_Size': 'category'}
+
+
+# Date formats accepted in the databases, tried in order. Day-first formats are preferred
+# over month-first ones, matching how dates are entered at the depots.
+DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M',
+                '%d-%m-%Y', '%d-%m-%Y %H:%M:%S', '%Y/%m/%d', '%Y/%m/%d %H:%M:%S', '%d.%m.%Y']
+
+# Parsed date strings shared by every reader thread (task worker, fleet depot pool)
+DATE_CACHE_SIZE = 100000
+_DATE_CACHE = {}
+_DATE_CACHE_LOCK = threading.Lock()
+
+
+def parse_date_column(series):
+    '''Parses a column of date strings into datetime64 deterministically and fast.
+    Only the unique strings not parsed before are parsed, each format in DATE_FORMATS is
+    applied to them in one vectorized pass with an explicit format, and the results are
+    cached for later chunks, under a lock as readers run on several threads. Strings matching
+    no format become NaT.'''
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    codes, raw = pd.factorize(series)
+    uniques = pd.Index([str(u).strip() for u in raw], dtype=object)
+
+    with _DATE_CACHE_LOCK:
+        known = {u: _DATE_CACHE[u] for u in uniques if u in _DATE_CACHE}
+
+    # Parse outside the lock, other threads keep reading the cache meanwhile
+    found = {}
+    pending = pd.Index([u for u in uniques if u not in known], dtype=object)
+    for fmt in DATE_FORMATS:
+        if len(pending) == 0:
+            break
+        parsed = pd.to_datetime(pending, format=fmt, errors='coerce')
+        ok = ~parsed.isna()
+        found.update(zip(pending[ok], parsed[ok]))
+        pending = pending[~ok]
+
+    if len(pending):
+        logger.warning(f"Unrecognized date values - {list(pending[:10])}")
+        found.update((u, pd.NaT) for u in pending)
+
+    if found:
+        with _DATE_CACHE_LOCK:
+            if len(_DATE_CACHE) + len(found) > DATE_CACHE_SIZE:
+                _DATE_CACHE.clear()
+            _DATE_CACHE.update(found)
+
+    known.update(found)
+    parsed = pd.DatetimeIndex([known[u] for u in uniques])
+
+    result = parsed.take(codes, allow_fill=True, fill_value=pd.NaT) if len(parsed) else pd.DatetimeIndex([pd.NaT] * len(codes))
+    return pd.Series(result, index=series.index)
+
+
+def parse_date_value(value):
+    '''Parses a single date string with DATE_FORMATS, raises ValueError if not recognized'''
+    result = parse_date_column(pd.Series([value]))[0]
+    if pd.isna(result):
+        raise ValueError(f"Unrecognized date - {value}")
+    return result
+
+
+def format_ledger_value(value):
+    '''Formats a single value the way pandas writes it into the csv databases'''
+    if value is None:
+        return ""
+    if isinstance(value, float) and np.isnan(value):
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+
+def schema_dates(schema):
+    '''Returns the datetime columns declared in a schema'''
+    return [c for c, t in schema.items() if t.startswith("datetime64")]
+
+
+def apply_schema(df, schema):
+    '''Converts the columns of df to the dtypes declared in schema.
+    Integer columns holding missing or fractional values fall back to float32'''
+    df = df.copy()
+    for col in df.columns:
+        dtype = schema.get(col, schema.get('*'))
+        if dtype is None or str(df[col].dtype) == dtype:
+            continue
+        if dtype.startswith("datetime64"):
+            df[col] = parse_date_column(df[col])
+        elif dtype.startswith("int") or dtype.startswith("float"):
+            values = pd.to_numeric(df[col], errors='coerce')
+            if dtype.startswith("int") and (values.isna().any() or (values % 1 != 0).any()):
+                dtype = "float32"
+            df[col] = values.astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def concat_typed(head, tail):
+    '''Concatenates two frames of the same schema keeping categorical columns categorical.
+    New categories of tail are appended to those of head so head's codes stay valid'''
+    head = head.copy(deep=False)
+    tail = tail.copy(deep=False)
+    for col in head.columns:
+        if isinstance(head[col].dtype, pd.CategoricalDtype) and col in tail.columns:
+            tail_cats = pd.Index(tail[col].dropna().unique())
+            new_cats = tail_cats.difference(head[col].cat.categories)
+            if len(new_cats):
+                head[col] = head[col].cat.add_categories(new_cats)
+            tail[col] = pd.Categorical(tail[col].astype(object), categories=head[col].cat.categories)
+    return pd.concat([head, tail], ignore_index=True)
+
+
+def memory_report(frames):
+    '''Returns the memory used per column of a dict of {name: DataFrame}'''
+    dlist = []
+    for name, df in frames.items():
+        usage = df.memory_usage(deep=True, index=False)
+        for col in df.columns:
+            dlist.append({"Table": name, "Column": col, "Dtype": str(df[col].dtype), "Rows": len(df), "Bytes": int(usage[col])})
+    return pd.DataFrame(dlist, columns=["Table", "Column", "Dtype", "Rows", "Bytes"])
+
+
+def filter_frame(df, date_col, start=None, end=None, **equals):
+    '''Filters a DataFrame on an inclusive date range and column equality, skipping None criteria'''
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df[date_col] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df[date_col] <= pd.Timestamp(end)
+    for col, value in equals.items():
+        if value is not None:
+            mask &= df[col] == value
+    return df[mask].reset_index(drop=True)
@@ -0,0 +1,551 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/storage.py
+"""
+Storage backends (csv and SQLite) with the cached DataStore the pages read through
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import os
+import json
+import shutil
+import sqlite3
+import logging
+import importlib.util
+
+import pandas as pd
+
+SNAPSHOT_FORMAT = "feather" if importlib.util.find_spec("pyarrow") is not None else "pkl"
+
+from .paths import (DATA_SOURCE, INV_FILE_NAME, INV_DB, INV_IN_FILE_NAME, INV_IN_DB, TYRE_FILE_NAME, TYRE_DB,
+                    INV_STATE_FILE_NAME, INV_STATE, SERIAL_INDEX_FILE_NAME, SERIAL_INDEX, CATALOG_FILE_NAME, CATALOG,
+                    ROLLUP_FILE_NAME, ROLLUP, SQLITE_FILE_NAME, SQLITE_DB)
+from .schema import (INV_IN_COLUMNS, TYRE_COLUMNS, INV_SCHEMA, INV_IN_SCHEMA, TYRE_SCHEMA, apply_schema, concat_typed,
+                     schema_dates, memory_report, filter_frame, format_ledger_value)
+from .csvio import append_ledger_row, append_ledger_rows, read_csv_since
+from .ledger import MonthlyInventoryLedger, RollupCube, InventoryValuation, inventory_movements, cumulative_inventory
+from .fitment import FitmentIndex, SerialIndex, ValueCatalog, normalize_serial
+
+logger = logging.getLogger(__name__)
+
+
+class CsvSnapshot():
+    '''
+    Columnar sidecar snapshot of a csv database (<name>.csv.feather, or .pkl without pyarrow)
+    with a small json file holding the csv high-water mark it was taken at, kept next to the
+    csv or in cache_dir. The csv stays the editable source of truth, the snapshot only saves
+    re-parsing it.
+    '''
+
+    def __init__(self, path, cache_dir=None):
+        self.path = path
+        base = path if cache_dir is None else os.path.join(cache_dir, os.path.basename(path))
+        self.data_file = f"{base}.{SNAPSHOT_FORMAT}"
+        self.meta_file = f"{base}.snapshot.json"
+
+    def load(self):
+        '''Returns (df, mark) of the last snapshot, or (None, None) if there is no usable snapshot'''
+        try:
+            with open(self.meta_file, 'r') as f:
+                meta = json.load(f)
+            if meta.get('format') != SNAPSHOT_FORMAT:
+                return None, None
+            if SNAPSHOT_FORMAT == "feather":
+                df = pd.read_feather(self.data_file)
+            else:
+                df = pd.read_pickle(self.data_file)
+            if len(df) != meta.get('rows'):
+                return None, None
+            return df, meta['mark']
+        except Exception as e:
+            logger.info(f"No usable snapshot for {self.path} - {e}")
+            return None, None
+
+    def save(self, df, mark):
+        tmp_file = f"{self.data_file}.tmp"
+        if SNAPSHOT_FORMAT == "feather":
+            df.reset_index(drop=True).to_feather(tmp_file)
+        else:
+            df.to_pickle(tmp_file)
+        os.replace(tmp_file, self.data_file)
+
+        tmp_file = f"{self.meta_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({'format': SNAPSHOT_FORMAT, 'rows': len(df), 'mark': mark}, f)
+        os.replace(tmp_file, self.meta_file)
+
+
+class DataStore():
+    '''
+    Process-wide in-memory cache of the csv databases, owned by TintApp and shared by all pages.
+
+    Each file is parsed once into a typed DataFrame. Every get() checks the file size and
+    modification time; rows appended since the last load (by our own ledger writers or
+    anyone else) are parsed from the tail only, and a rewritten file (including an edit of
+    rows already loaded, caught by the checksum of the high-water mark) is reloaded in full.
+    Cold loads start from the columnar snapshot of the file when it is still valid, which
+    is rebuilt lazily once the csv was rewritten or has grown by SNAPSHOT_TAIL_ROWS.
+    Frames handed out are shared, callers must not modify them in place.
+    The generation of a file changes whenever its frame is not an extension of the previous
+    one, so derived indexes know when to rebuild instead of applying the appended rows.
+    Snapshots are written next to the csv files, or into cache_dir when given.
+    '''
+
+    SNAPSHOT_TAIL_ROWS = 1000
+
+    def __init__(self, use_snapshots=True, cache_dir=None):
+        self.use_snapshots = use_snapshots
+        self.cache_dir = cache_dir
+        self._cache = {}
+        self._generations = {}
+
+    def get(self, path, schema):
+        st = os.stat(path)
+        stat = (st.st_size, st.st_mtime_ns)
+
+        entry = self._cache.get(path)
+        if entry is not None and entry['stat'] == stat:
+            return entry['df']
+        cold = entry is None
+
+        snapshot = CsvSnapshot(path, self.cache_dir) if self.use_snapshots else None
+        if entry is None and snapshot is not None:
+            cached, mark = snapshot.load()
+            if cached is not None:
+                entry = {'df': cached, 'mark': mark, 'tail_rows': 0}
+                logger.info(f"Loaded {len(cached)} rows from snapshot {snapshot.data_file}")
+
+        df, mark, full = read_csv_since(path, entry['mark'] if entry else None, parse_dates=schema_dates(schema))
+        df = apply_schema(df, schema)
+        tail_rows = 0 if full else entry['tail_rows'] + len(df)
+        if full:
+            logger.info(f"Loaded {len(df)} rows from {path}")
+        elif len(df):
+            logger.info(f"Loaded {len(df)} appended rows from {path}")
+            df = concat_typed(entry['df'], df)
+        else:
+            df = entry['df']
+
+        if snapshot is not None and (full or tail_rows >= self.SNAPSHOT_TAIL_ROWS):
+            try:
+                snapshot.save(df, mark)
+                tail_rows = 0
+                logger.info(f"Snapshot saved - {snapshot.data_file}")
+            except Exception as e:
+                logger.exception(f"Error saving snapshot for {path} - {e}")
+
+        if cold or full:
+            self._generations[path] = self._generations.get(path, 0) + 1
+        self._cache[path] = {'stat': stat, 'mark': mark, 'df': df, 'tail_rows': tail_rows}
+        return df
+
+    def generation(self, path):
+        '''Returns the generation of the frame last returned for path'''
+        return self._generations.get(path, 0)
+
+    def memory_report(self):
+        '''Returns the memory used per column of the cached frames'''
+        return memory_report({os.path.basename(path): entry['df'] for path, entry in self._cache.items()})
+
+    def invalidate(self, path=None):
+        '''Drops one cached file, or all of them'''
+        if path is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(path, None)
+
+
+class CsvStorage():
+    '''
+    Storage backend on the csv databases in the data directory.
+    Every page reads and writes tyre and inventory records through a storage backend.
+    '''
+
+    name = "csv"
+
+    def __init__(self, inv_db=INV_DB, inv_in_db=INV_IN_DB, tyre_db=TYRE_DB, state_file=INV_STATE, datastore=None, serial_index_file=SERIAL_INDEX,
+                 catalog_file=CATALOG, rollup_file=ROLLUP):
+        self.inv_db = inv_db
+        self.inv_in_db = inv_in_db
+        self.tyre_db = tyre_db
+        self.ledger = MonthlyInventoryLedger(inv_db, inv_in_db, tyre_db, state_file)
+        self.serial_index = SerialIndex(tyre_db, serial_index_file)
+        self.catalog = ValueCatalog(tyre_db, inv_in_db, catalog_file)
+        self.rollup_file = rollup_file
+        self._rollup = None
+        self._valuation = None
+        self._valuation_generations = None
+        self.datastore = DataStore() if datastore is None else datastore
+        self._fitments = None
+        self._fitment_generation = None
+
+    def read_receipts(self, tyre_name=None, start=None, end=None):
+        df = self.datastore.get(self.inv_in_db, INV_IN_SCHEMA)
+        return filter_frame(df, 'Datetime', start, end, Tyre_Name=tyre_name)
+
+    def read_tyre_events(self, vehicle_number=None, tyre_serial=None, tyre_name=None, start=None, end=None):
+        df = self.datastore.get(self.tyre_db, TYRE_SCHEMA)
+        return filter_frame(df, 'Date', start, end, Vehicle_Number=vehicle_number, Tyre_Serial=tyre_serial, Tyre_Name=tyre_name)
+
+    def data_version(self):
+        '''Returns a token that changes whenever the receipts or tracking events change'''
+        inv = self.datastore.get(self.inv_in_db, INV_IN_SCHEMA)
+        trk = self.datastore.get(self.tyre_db, TYRE_SCHEMA)
+        return (self.datastore.generation(self.inv_in_db), len(inv), self.datastore.generation(self.tyre_db), len(trk))
+
+    def vehicle_numbers(self):
+        return self.distinct_values('Vehicle_Number')
+
+    def distinct_values(self, column):
+        '''Returns the distinct values of Vehicle_Number, Tyre_Name, Employee_Name or Tyre_Location in the data'''
+        return self.catalog.values(column)
+
+    def append_receipt(self, row):
+        append_ledger_row(self.inv_in_db, row, INV_IN_COLUMNS)
+        self.catalog.update()
+
+    def append_tyre_events(self, rows):
+        append_ledger_rows(self.tyre_db, rows, TYRE_COLUMNS)
+        self.serial_index.update()
+        self.catalog.update()
+        self.fitments()
+
+    def serial_history(self, tyre_serial):
+        '''Returns every tracking event of a tyre serial in date order, across all vehicles'''
+        positions = self.serial_index.positions(tyre_serial)
+        df = self.datastore.get(self.tyre_db, TYRE_SCHEMA)
+        return df.iloc[[p for p in positions if p < len(df)]].sort_values('Date', kind='mergesort')
+
+    def fitments(self):
+        '''Returns the current fitment index, brought up to date with the tracking database'''
+        df = self.datastore.get(self.tyre_db, TYRE_SCHEMA)
+        generation = self.datastore.generation(self.tyre_db)
+        if self._fitments is None or self._fitment_generation != generation or len(df) < self._fitments.rows:
+            self._fitments = FitmentIndex()
+            self._fitment_generation = generation
+        if len(df) > self._fitments.rows:
+            self._fitments.apply(df.iloc[self._fitments.rows:])
+        return self._fitments
+
+    def movements(self, start=None, end=None):
+        '''Returns the inventory movement ledger (see inventory_movements) between two dates'''
+        return inventory_movements(self.read_receipts(start=start, end=end), self.read_tyre_events(start=start, end=end))
+
+    def valuation(self):
+        '''Returns the inventory valuation, brought up to date with the databases'''
+        inv = self.datastore.get(self.inv_in_db, INV_IN_SCHEMA)
+        trk = self.datastore.get(self.tyre_db, TYRE_SCHEMA)
+        generations = (self.datastore.generation(self.inv_in_db), self.datastore.generation(self.tyre_db))
+        v = self._valuation
+        if any([v is None, self._valuation_generations != generations, v is not None and (len(inv) < v.rows['receipts'] or len(trk) < v.rows['tracking'])]) \
+                or not v.apply(inv.iloc[v.rows['receipts']:], trk.iloc[v.rows['tracking']:]):
+            logger.info("Rebuilding inventory valuation")
+            self._valuation = InventoryValuation()
+            self._valuation.apply(inv, trk)
+            self._valuation_generations = generations
+        return self._valuation
+
+    def rollup(self):
+        '''Returns the monthly rollup cube, brought up to date with the databases'''
+        if self._rollup is None:
+            try:
+                with open(self.rollup_file, 'r') as f:
+                    self._rollup = RollupCube(json.load(f))
+            except (IOError, ValueError, KeyError) as e:
+                logger.info(f"Rebuilding rollup cube - {e}")
+                self._rollup = RollupCube()
+
+        changed = False
+        for source, path, date_col in [("receipts", self.inv_in_db, 'Datetime'), ("tracking", self.tyre_db, 'Date')]:
+            df, mark, full = read_csv_since(path, self._rollup.marks.get(source), parse_dates=[date_col])
+            if full or len(df):
+                self._rollup.apply(source, df, mark, full)
+                changed = True
+
+        if changed:
+            try:
+                tmp_file = f"{self.rollup_file}.tmp"
+                with open(tmp_file, 'w') as f:
+                    json.dump(self._rollup.state(), f)
+                os.replace(tmp_file, self.rollup_file)
+            except Exception as e:
+                logger.exception(f"Error saving rollup cube {self.rollup_file} - {e}")
+        return self._rollup
+
+    def update_inventory(self):
+        return self.ledger.update()
+
+    def read_inventory(self):
+        return apply_schema(pd.read_csv(self.inv_db), INV_SCHEMA).set_index('Time')
+
+    def export_csv(self, table, path):
+        '''Exports a table ("receipts", "inventory" or "tyre_events") as csv file'''
+        src = {"receipts": self.inv_in_db, "inventory": self.inv_db, "tyre_events": self.tyre_db}[table]
+        shutil.copy(src, path)
+
+
+SQLITE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tyre_inventory_in (
+    Datetime TEXT, Tyre_Name TEXT, Quantity REAL, "Cost/Unit" REAL, Total_Cost REAL);
+CREATE INDEX IF NOT EXISTS ix_inventory_in_datetime ON tyre_inventory_in (Datetime);
+CREATE INDEX IF NOT EXISTS ix_inventory_in_tyre_name ON tyre_inventory_in (Tyre_Name);
+
+CREATE TABLE IF NOT EXISTS tyre_tracking (
+    Date TEXT, Activity TEXT, Reason TEXT, Employee_Name TEXT, Tyre_Name TEXT, Tyre_Serial TEXT,
+    Vehicle_Number TEXT, Vehicle_Type TEXT, Vehicle_Mileage REAL, Tyre_Location TEXT, Tyre_Size TEXT);
+CREATE INDEX IF NOT EXISTS ix_tracking_date ON tyre_tracking (Date);
+CREATE INDEX IF NOT EXISTS ix_tracking_vehicle_number ON tyre_tracking (Vehicle_Number, Date);
+CREATE INDEX IF NOT EXISTS ix_tracking_tyre_serial ON tyre_tracking (Tyre_Serial);
+CREATE INDEX IF NOT EXISTS ix_tracking_serial_key ON tyre_tracking (upper(trim(Tyre_Serial)));
+CREATE INDEX IF NOT EXISTS ix_tracking_tyre_name ON tyre_tracking (Tyre_Name, Date);
+
+CREATE TABLE IF NOT EXISTS tyre_inventory (
+    Time TEXT, Tyre_Name TEXT, Quantity REAL, PRIMARY KEY (Time, Tyre_Name));
+'''
+
+
+class SqliteStorage():
+    '''
+    Storage backend on a single local SQLite database (WAL mode), holding the receipt,
+    tracking and monthly inventory tables with indexes on Date, Vehicle_Number,
+    Tyre_Serial and Tyre_Name so lookups and date ranges do not scan every record.
+    Dates are stored as ISO text so ranges compare as strings.
+    '''
+
+    name = "sqlite"
+
+    def __init__(self, db_file=SQLITE_DB):
+        self.db_file = db_file
+        with self.connect() as conn:
+            conn.executescript(SQLITE_SCHEMA)
+        self._fitments = None
+        self._fitment_rowid = 0
+        self._rollup = None
+        self._valuation = None
+        self._valuation_rowids = None
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _query(self, sql, params=(), parse_dates=None):
+        conn = self.connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params, parse_dates=parse_dates)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _where(date_col, start, end, **equals):
+        '''Returns the WHERE clause and parameters of an inclusive date range and column equality.
+        Date holds 'YYYY-MM-DD' text, so its bounds are whole days: a start within a day begins
+        on the next day and an end within a day covers that day, as when comparing timestamps'''
+        clauses, params = [], []
+        if start is not None:
+            clauses.append(f"{date_col} >= ?")
+            start = pd.Timestamp(start)
+            params.append(start.strftime("%Y-%m-%d %H:%M:%S") if date_col == "Datetime" else start.ceil('D').strftime("%Y-%m-%d"))
+        if end is not None:
+            clauses.append(f"{date_col} <= ?")
+            end = pd.Timestamp(end)
+            params.append(end.strftime("%Y-%m-%d %H:%M:%S") if date_col == "Datetime" else end.strftime("%Y-%m-%d"))
+        for col, value in equals.items():
+            if value is not None:
+                clauses.append(f"{col} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def read_receipts(self, tyre_name=None, start=None, end=None):
+        where, params = self._where("Datetime", start, end, Tyre_Name=tyre_name)
+        return apply_schema(self._query(f"SELECT * FROM tyre_inventory_in{where} ORDER BY rowid", params, parse_dates=['Datetime']), INV_IN_SCHEMA)
+
+    def read_tyre_events(self, vehicle_number=None, tyre_serial=None, tyre_name=None, start=None, end=None):
+        where, params = self._where("Date", start, end, Vehicle_Number=vehicle_number, Tyre_Serial=tyre_serial, Tyre_Name=tyre_name)
+        return apply_schema(self._query(f"SELECT * FROM tyre_tracking{where} ORDER BY rowid", params, parse_dates=['Date']), TYRE_SCHEMA)
+
+    def data_version(self):
+        '''Returns a token that changes whenever rows are inserted into the receipt or tracking tables'''
+        conn = self.connect()
+        try:
+            return conn.execute("SELECT (SELECT MAX(rowid) FROM tyre_inventory_in), (SELECT COUNT(*) FROM tyre_inventory_in), "
+                                "(SELECT MAX(rowid) FROM tyre_tracking), (SELECT COUNT(*) FROM tyre_tracking)").fetchone()
+        finally:
+            conn.close()
+
+    def vehicle_numbers(self):
+        return self.distinct_values('Vehicle_Number')
+
+    def distinct_values(self, column):
+        '''Returns the distinct values of Vehicle_Number, Tyre_Name, Employee_Name or Tyre_Location in the data'''
+        if column not in ValueCatalog.COLUMNS['tracking']:
+            raise ValueError(f"No catalog for column {column}")
+        sql = f'SELECT DISTINCT "{column}" FROM tyre_tracking WHERE "{column}" IS NOT NULL'
+        if column in ValueCatalog.COLUMNS['receipts']:
+            sql += f' UNION SELECT DISTINCT "{column}" FROM tyre_inventory_in WHERE "{column}" IS NOT NULL'
+        return list(self._query(sql)[column])
+
+    def _insert(self, table, columns, rows):
+        cols = ", ".join(f'"{c}"' for c in columns)
+        marks = ", ".join("?" for c in columns)
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany(f"INSERT INTO {table} ({cols}) VALUES ({marks})",
+                                 [[None if row.get(c) is None else format_ledger_value(row.get(c)) for c in columns] for row in rows])
+        finally:
+            conn.close()
+
+    def append_receipt(self, row):
+        self._insert("tyre_inventory_in", INV_IN_COLUMNS, [row])
+
+    def append_tyre_events(self, rows):
+        self._insert("tyre_tracking", TYRE_COLUMNS, rows)
+        self.fitments()
+
+    def serial_history(self, tyre_serial):
+        '''Returns every tracking event of a tyre serial in date order, across all vehicles'''
+        return apply_schema(self._query("SELECT * FROM tyre_tracking WHERE upper(trim(Tyre_Serial)) = ? ORDER BY Date, rowid",
+                                        (normalize_serial(tyre_serial),), parse_dates=['Date']), TYRE_SCHEMA)
+
+    def fitments(self):
+        '''Returns the current fitment index, brought up to date with the rows inserted since the last call'''
+        if self._fitments is None:
+            self._fitments = FitmentIndex()
+            self._fitment_rowid = 0
+        df = self._query("SELECT rowid AS _rowid, * FROM tyre_tracking WHERE rowid > ? ORDER BY rowid", (self._fitment_rowid,), parse_dates=['Date'])
+        if len(df):
+            self._fitment_rowid = int(df['_rowid'].max())
+            self._fitments.apply(df)
+        return self._fitments
+
+    def movements(self, start=None, end=None):
+        '''Returns the inventory movement ledger (see inventory_movements) between two dates'''
+        return inventory_movements(self.read_receipts(start=start, end=end), self.read_tyre_events(start=start, end=end))
+
+    def valuation(self):
+        '''Returns the inventory valuation, brought up to date with the rows inserted since the last call'''
+        rowids = self._valuation_rowids or (0, 0)
+        inv = self._query("SELECT rowid AS _rowid, * FROM tyre_inventory_in WHERE rowid > ? ORDER BY rowid", (rowids[0],), parse_dates=['Datetime'])
+        trk = self._query("SELECT rowid AS _rowid, * FROM tyre_tracking WHERE rowid > ? ORDER BY rowid", (rowids[1],), parse_dates=['Date'])
+        if self._valuation is None or not self._valuation.apply(inv, trk):
+            logger.info("Rebuilding inventory valuation")
+            inv = self._query("SELECT rowid AS _rowid, * FROM tyre_inventory_in ORDER BY rowid", parse_dates=['Datetime'])
+            trk = self._query("SELECT rowid AS _rowid, * FROM tyre_tracking ORDER BY rowid", parse_dates=['Date'])
+            self._valuation = InventoryValuation()
+            self._valuation.apply(inv, trk)
+        self._valuation_rowids = (int(inv['_rowid'].max()) if len(inv) else rowids[0],
+                                  int(trk['_rowid'].max()) if len(trk) else rowids[1])
+        return self._valuation
+
+    def rollup(self):
+        '''Returns the monthly rollup cube, brought up to date with the rows inserted since the last call'''
+        if self._rollup is None:
+            self._rollup = RollupCube()
+        for source, table, date_col in [("receipts", "tyre_inventory_in", 'Datetime'), ("tracking", "tyre_tracking", 'Date')]:
+            mark = self._rollup.marks.get(source) or 0
+            df = self._query(f"SELECT rowid AS _rowid, * FROM {table} WHERE rowid > ? ORDER BY rowid", (mark,), parse_dates=[date_col])
+            if len(df):
+                self._rollup.apply(source, df, int(df['_rowid'].max()))
+        return self._rollup
+
+    def update_inventory(self):
+        deltas = pd.concat([
+            self._query("SELECT substr(Datetime, 1, 7) AS Time, Tyre_Name, SUM(Quantity) AS Quantity FROM tyre_inventory_in GROUP BY 1, 2"),
+            self._query("SELECT substr(Date, 1, 7) AS Time, Tyre_Name, -COUNT(*) AS Quantity FROM tyre_tracking WHERE Tyre_Name IS NOT NULL GROUP BY 1, 2"),
+        ]).groupby(['Time', 'Tyre_Name'])['Quantity'].sum().unstack(fill_value=0)
+        received = sorted(self._query("SELECT DISTINCT Tyre_Name FROM tyre_inventory_in WHERE Tyre_Name IS NOT NULL")['Tyre_Name'])
+
+        pv = cumulative_inventory(deltas, received)
+
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM tyre_inventory")
+                conn.executemany("INSERT INTO tyre_inventory (Time, Tyre_Name, Quantity) VALUES (?, ?, ?)",
+                                 [(t, c, float(q)) for t, row in pv.iterrows() for c, q in row.items()])
+        finally:
+            conn.close()
+        return pv
+
+    def read_inventory(self):
+        df = self._query("SELECT Time, Tyre_Name, Quantity FROM tyre_inventory")
+        pv = df.pivot_table(values='Quantity', index='Time', columns='Tyre_Name', aggfunc='sum')
+        pv.columns.name = None
+        return apply_schema(pv.reset_index(), INV_SCHEMA).set_index('Time')
+
+    def export_csv(self, table, path):
+        '''Exports a table ("receipts", "inventory" or "tyre_events") as csv file'''
+        if table == "receipts":
+            df = self.read_receipts()
+        elif table == "inventory":
+            df = self.read_inventory().reset_index()
+        else:
+            df = self.read_tyre_events()
+        df.to_csv(path, index=False)
+
+
+def migrate_csv_to_sqlite(db_file=SQLITE_DB, inv_in_db=INV_IN_DB, tyre_db=TYRE_DB):
+    '''One-shot migration of the receipt and tracking csv databases into a new SQLite database.
+    The database is built under a temporary name and moved into place once complete,
+    the csv files are left untouched as a backup.'''
+    if os.path.isfile(db_file):
+        raise FileExistsError(f"SQLite database already exists - {db_file}")
+
+    inv = read_csv_since(inv_in_db, parse_dates=['Datetime'])[0].reindex(columns=INV_IN_COLUMNS)
+    trk = read_csv_since(tyre_db, parse_dates=['Date'])[0].reindex(columns=TYRE_COLUMNS)
+    inv['Datetime'] = inv['Datetime'].dt.strftime("%Y-%m-%d %H:%M:%S")
+    trk['Date'] = trk['Date'].dt.strftime("%Y-%m-%d")
+
+    tmp_file = f"{db_file}.tmp"
+    if os.path.isfile(tmp_file):
+        os.remove(tmp_file)
+
+    storage = SqliteStorage(tmp_file)
+    conn = sqlite3.connect(tmp_file)
+    try:
+        with conn:
+            inv.to_sql("tyre_inventory_in", conn, if_exists="append", index=False)
+            trk.to_sql("tyre_tracking", conn, if_exists="append", index=False)
+        storage.update_inventory()
+        conn.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        conn.close()
+
+    os.replace(tmp_file, db_file)
+    logger.info(f"Migrated {len(inv)} receipts and {len(trk)} tyre events into {db_file}")
+
+
+def open_storage(data_source=DATA_SOURCE, datastore=None, cache_dir=None):
+    '''Returns the SQLite backend if the data directory holds a migrated database, else the csv backend
+    reading through datastore. With cache_dir, the csv backend keeps the files it derives from the
+    databases (monthly inventory and its state, snapshots, serial index, catalog and rollup) there
+    instead of in the data directory, for readers that must not write into it'''
+    db_file = os.path.join(data_source, SQLITE_FILE_NAME)
+    if os.path.isfile(db_file):
+        return SqliteStorage(db_file)
+    derived = data_source
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        derived = cache_dir
+        if datastore is None:
+            datastore = DataStore(cache_dir=cache_dir)
+    return CsvStorage(os.path.join(derived, INV_FILE_NAME), os.path.join(data_source, INV_IN_FILE_NAME),
+                      os.path.join(data_source, TYRE_FILE_NAME), os.path.join(derived, INV_STATE_FILE_NAME),
+                      datastore=datastore, serial_index_file=os.path.join(derived, SERIAL_INDEX_FILE_NAME),
+                      catalog_file=os.path.join(derived, CATALOG_FILE_NAME),
+                      rollup_file=os.path.join(derived, ROLLUP_FILE_NAME))
@@ -0,0 +1,103 @@
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                            Python module                                    #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+#
+# Ident        : traqwhel/tasks.py
+"""
+Background task runner keeping slow loads and aggregations off the GUI thread
+"""
+#
+#-----------------------------------------------------------------------------#
+#                                                                             #
+#                           BSD 3-Clause License                              #
+#                  Copyright (c) 2021, AXONBOTS PTE. LTD.                     #
+#                           All rights reserved                               #
+#                                                                             #
+#-----------------------------------------------------------------------------#
+
+# Import Modules
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRunner():
+    '''
+    Runs jobs on a worker thread and hands their results back to the GUI thread.
+
+    Jobs are submitted to a named slot (one per chart area or panel). A new job in a slot
+    supersedes the previous one: it is cancelled if it has not started, otherwise its result
+    is dropped when it finishes. Jobs submitted without a slot (record appends, exports) are
+    queued instead and never superseded, shutdown() waits for them. The GUI thread calls
+    poll() from a Tk after() loop, which runs the callbacks of the finished jobs, so callbacks
+    are free to touch widgets.
+    Jobs run one at a time, so the worker is the only thread using the storage and the GUI
+    thread never waits for a running job.
+    '''
+
+    def __init__(self, workers=1):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="traqwhel-task")
+        self._jobs = {}
+        self._seq = 0
+
+    def submit(self, slot, func, *args, on_done=None, on_error=None, **kwargs):
+        '''Runs func(*args, **kwargs) on the worker. on_done(result) or on_error(exception) are
+        called from poll() unless another job was submitted to the slot in the meantime.
+        slot None queues the job under a slot of its own. Returns the job number'''
+        self._seq += 1
+        if slot is None:
+            slot = ("queued", self._seq)
+        else:
+            self.cancel(slot)
+        future = self._executor.submit(func, *args, **kwargs)
+        self._jobs[slot] = {'seq': self._seq, 'future': future, 'on_done': on_done, 'on_error': on_error}
+        return self._seq
+
+    def cancel(self, slot=None):
+        '''Drops the job of a slot, or of all slots'''
+        for key in list(self._jobs) if slot is None else [slot]:
+            job = self._jobs.pop(key, None)
+            if job is not None:
+                started = not job['future'].cancel()
+                logger.info(f"Task {key} #{job['seq']} {'superseded while running' if started else 'cancelled'}")
+
+    def pending(self, slot=None):
+        '''Returns the number of jobs not delivered yet, or whether the slot has one'''
+        return len(self._jobs) if slot is None else slot in self._jobs
+
+    def poll(self):
+        '''Delivers the finished jobs to their callbacks, call from the GUI thread.
+        Returns the number of jobs still pending'''
+        for slot, job in list(self._jobs.items()):
+            if not job['future'].done():
+                continue
+            del self._jobs[slot]
+            try:
+                try:
+                    result = job['future'].result()
+                except Exception as e:
+                    if job['on_error'] is None:
+                        logger.error(f"Task {slot} #{job['seq']} failed - {e}", exc_info=e)
+                    else:
+                        job['on_error'](e)
+                    continue
+                if job['on_done'] is not None:
+                    job['on_done'](result)
+            except Exception as e:
+                logger.exception(f"Error delivering task {slot} #{job['seq']} - {e}")
+        return len(self._jobs)
+
+    def shutdown(self):
+        '''Cancels the jobs in named slots and stops the worker. Waits for the queued jobs
+        if any are pending, otherwise returns without waiting for a running job'''
+        queued = [slot for slot in self._jobs if isinstance(slot, tuple) and slot[0] == "queued"]
+        for slot in list(self._jobs):
+            if slot not in queued:
+                self.cancel(slot)
+        if queued:
+            logger.info(f"Waiting for {len(queued)} queued task(s)")
+        self._executor.shutdown(wait=bool(queued))